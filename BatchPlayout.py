@@ -0,0 +1,395 @@
+import numpy as np
+
+from Constants import *
+from Position import *
+
+# Owner of an undrawn edge. Drawn edges hold the value of the Player who drew them (Player.NONE for edges that were
+# already drawn when the batch was made)
+UNDRAWN = -1
+
+# Random key given to drawn edges, below any undrawn edge's
+_DRAWN_KEY = -4.0
+
+# Bytes needed to hold an edge or box mask
+_EDGE_BYTES = (EDGE_COUNT + 7) // 8
+_BOX_BYTES = (BOX_COUNT + 7) // 8
+
+
+def _buildIncidence():
+    """
+    Precompute the edge <-> box incidence arrays used by GameBatch.
+    """
+    incidence = np.zeros((EDGE_COUNT, BOX_COUNT), dtype=np.int8)
+    pairs = np.full((2, EDGE_COUNT), BOX_COUNT, dtype=np.intp)
+    for edge in range(0, EDGE_COUNT):
+        for slot, box in enumerate(EDGE_BOXES[edge]):
+            incidence[edge, box] = 1
+            pairs[slot, edge] = box
+
+    # The spare box stands in for a missing neighbor; rescoring its edges is harmless
+    boxEdges = np.array(BOX_EDGES + BOX_EDGES[:1], dtype=np.intp)
+    return incidence, pairs, boxEdges
+
+
+# BOX_INCIDENCE[e, b]: 1 if edge e is a side of box b
+# EDGE_BOX_PAIRS[:, e]: the one or two boxes touching edge e, padded with BOX_COUNT (a spare column of GameBatch.sides)
+# BOX_EDGE_TABLE[b]: the four edges of box b, with a row for the spare box
+BOX_INCIDENCE, EDGE_BOX_PAIRS, BOX_EDGE_TABLE = _buildIncidence()
+
+
+def _unpackMask(mask, size, byteCount):
+    """
+    Turn a bit mask into a bool array of its first size bits
+    """
+    bits = np.unpackbits(np.frombuffer(mask.to_bytes(byteCount, 'little'), dtype=np.uint8), bitorder='little')
+    return bits[:size].astype(bool)
+
+
+def _packMask(bits):
+    """
+    Turn a bool array back into a bit mask
+    """
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+
+class GameBatch:
+    """
+    Many games played side by side with NumPy. Every game is a row of an (N, EDGE_COUNT) array of edge owners and an
+    (N, BOX_COUNT) array of box owners, plus the number of drawn sides of every box and the player to move, so moves
+    can be made, boxes completed and games scored for the whole batch with a handful of array operations. Every step
+    draws one edge in every unfinished game.
+
+    Parameters
+    ------------
+        positions: list Position
+            Starting position of every game
+        players: list Player
+            Player to move in every game
+    """
+
+    def __init__(self, positions, players):
+        count = len(positions)
+        self.rows = np.arange(count)
+        self.owners = np.full((count, EDGE_COUNT), UNDRAWN, dtype=np.int8)
+        self.boxOwners = np.zeros((count, BOX_COUNT), dtype=np.int8)
+        for row, position in enumerate(positions):
+            self.owners[row, _unpackMask(position.edges, EDGE_COUNT, _EDGE_BYTES)] = Player.NONE.value
+            self.boxOwners[row, _unpackMask(position.p1Boxes, BOX_COUNT, _BOX_BYTES)] = Player.P1.value
+            self.boxOwners[row, _unpackMask(position.p2Boxes, BOX_COUNT, _BOX_BYTES)] = Player.P2.value
+
+        # Drawn sides of every box, with a spare last column that soaks up the padding in EDGE_BOX_PAIRS
+        drawn = self.owners != UNDRAWN
+        self.sides = np.zeros((count, BOX_COUNT + 1), dtype=np.int8)
+        self.sides[:, :BOX_COUNT] = drawn.astype(np.int8) @ BOX_INCIDENCE
+
+        self.players = np.array([player.value for player in players], dtype=np.int8)
+        self.remaining = EDGE_COUNT - drawn.sum(axis=1)
+
+    @staticmethod
+    def repeat(position, player, count):
+        """
+        Make a batch of count games that all start from the same position.
+
+        Parameters
+        ----------
+            position: Position
+                Starting position.
+
+            player: Player
+                Player to move.
+
+            count: int
+                Number of games.
+
+        Returns
+        -------
+            GameBatch: The batch
+        """
+        batch = GameBatch([position], [player])
+        batch.rows = np.arange(count)
+        batch.owners = np.repeat(batch.owners, count, axis=0)
+        batch.boxOwners = np.repeat(batch.boxOwners, count, axis=0)
+        batch.sides = np.repeat(batch.sides, count, axis=0)
+        batch.players = np.repeat(batch.players, count)
+        batch.remaining = np.repeat(batch.remaining, count)
+        return batch
+
+    def __len__(self):
+        return len(self.rows)
+
+    def isFinished(self):
+        """
+        Whether every game in the batch is over
+        """
+        return not self.remaining.any()
+
+    def randomKeys(self, rng):
+        """
+        Draw a random key for every edge of every game, for pickMoves. Drawn edges get a key below every undrawn one.
+
+        Parameters
+        ----------
+            rng: numpy.random.Generator
+                Source of random numbers.
+
+        Returns
+        -------
+            numpy.ndarray: (N, EDGE_COUNT) float32 keys
+        """
+        keys = rng.random(self.owners.shape, dtype=np.float32)
+        keys[self.owners != UNDRAWN] = _DRAWN_KEY
+        return keys
+
+    def chooseMoves(self, rng, heuristic=True):
+        """
+        Pick a random move in every game. With the heuristic, a box is taken whenever one is there, otherwise a safe
+        move is made if there is one (the same policy as MCTS.playout).
+
+        Parameters
+        ----------
+            rng: numpy.random.Generator
+                Source of random moves.
+
+            heuristic: bool
+                Whether to prefer captures and safe moves over other moves.
+
+        Returns
+        -------
+            numpy.ndarray: Edge index of the move for every game (arbitrary for finished games)
+        """
+        return self.pickMoves(self.randomKeys(rng), heuristic)
+
+    def pickMoves(self, keys, heuristic=True):
+        """
+        Pick the undrawn edge with the highest random key in every game, captures first and then safe moves with the
+        heuristic. Keys drawn once can be used for a whole playout, as long as the keys of the edges drawn since are
+        lowered, which is as random as drawing new ones every move and much cheaper.
+
+        Parameters
+        ----------
+            keys: numpy.ndarray
+                Keys from randomKeys.
+
+            heuristic: bool
+                Whether to prefer captures and safe moves over other moves.
+
+        Returns
+        -------
+            numpy.ndarray: Edge index of the move for every game (arbitrary for finished games)
+        """
+        return (self.scoreEdges(keys) if heuristic else keys).argmax(axis=1)
+
+    def scoreEdges(self, keys, edges=None):
+        """
+        Score edges for the heuristic: the edge's random key, plus 2 if drawing it takes a box or 1 if it is safe.
+
+        Parameters
+        ----------
+            keys: numpy.ndarray
+                Keys from randomKeys.
+
+            edges: numpy.ndarray
+                (N, M) edge indices to score in every game, or None for every edge.
+
+        Returns
+        -------
+            numpy.ndarray: (N, M) or (N, EDGE_COUNT) float32 scores
+        """
+        # Kept in float32 throughout, since mixing types is far slower than the arithmetic
+        if edges is None:
+            most = np.maximum(self.sides[:, EDGE_BOX_PAIRS[0]], self.sides[:, EDGE_BOX_PAIRS[1]])
+            scores = keys + (most < 2).astype(np.float32)
+        else:
+            rows = self.rows[:, np.newaxis]
+            most = np.maximum(self.sides[rows, EDGE_BOX_PAIRS[0][edges]], self.sides[rows, EDGE_BOX_PAIRS[1][edges]])
+            scores = keys[rows, edges] + (most < 2).astype(np.float32)
+        scores += 2 * (most == 3).astype(np.float32)
+        return scores
+
+    def applyMoves(self, moves):
+        """
+        Draw one edge in every unfinished game. A player who completes a box moves again.
+
+        Parameters
+        ----------
+            moves: numpy.ndarray
+                Edge index to draw in every game (must be undrawn in unfinished games).
+
+        Returns
+        -------
+            numpy.ndarray: Number of boxes completed in every game (0, 1 or 2)
+        """
+        completedCounts = np.zeros(len(self.rows), dtype=np.int8)
+        rows = self.rows[self.remaining > 0]
+        if not len(rows):
+            return completedCounts
+        moves = moves[rows]
+        players = self.players[rows]
+
+        self.owners[rows, moves] = players
+        pairs = EDGE_BOX_PAIRS[:, moves].T
+        self.sides[rows, pairs[:, 0]] += 1
+        self.sides[rows, pairs[:, 1]] += 1
+        self.sides[:, BOX_COUNT] = 0
+
+        # A box is completed by the move that draws its fourth side
+        completed = self.sides[rows[:, np.newaxis], pairs] == 4
+        completedRows, slots = np.nonzero(completed)
+        self.boxOwners[rows[completedRows], pairs[completedRows, slots]] = players[completedRows]
+
+        counts = completed.sum(axis=1)
+        switch = counts == 0
+        self.players[rows[switch]] = Player.P1.value + Player.P2.value - players[switch]
+        self.remaining[rows] -= 1
+
+        completedCounts[rows] = counts
+        return completedCounts
+
+    def playOut(self, rng, heuristic=True):
+        """
+        Play every game to the end, picking moves as chooseMoves does.
+
+        Parameters
+        ----------
+            rng: numpy.random.Generator
+                Source of random moves.
+
+            heuristic: bool
+                Whether to prefer captures and safe moves over other moves.
+
+        Returns
+        -------
+            numpy.ndarray: Final margins (see margins)
+        """
+        keys = self.randomKeys(rng)
+        scores = self.scoreEdges(keys) if heuristic else keys
+        rows = self.rows[:, np.newaxis]
+        while not self.isFinished():
+            moves = scores.argmax(axis=1)
+            self.applyMoves(moves)
+            keys[self.rows, moves] = _DRAWN_KEY
+
+            # Only the edges of the boxes beside the move change score
+            if heuristic:
+                touched = BOX_EDGE_TABLE[EDGE_BOX_PAIRS[:, moves].T].reshape(len(self.rows), 8)
+                scores[rows, touched] = self.scoreEdges(keys, touched)
+        return self.margins()
+
+    def margins(self):
+        """
+        Score every game.
+
+        Returns
+        -------
+            numpy.ndarray: P1's boxes minus P2's boxes in every game
+        """
+        p1 = (self.boxOwners == Player.P1.value).sum(axis=1)
+        p2 = (self.boxOwners == Player.P2.value).sum(axis=1)
+        return p1 - p2
+
+    def toPosition(self, row):
+        """
+        Get one game of the batch as a Position.
+
+        Parameters
+        ----------
+            row: int
+                Which game.
+
+        Returns
+        -------
+            Position: The game's current position
+        """
+        return Position(_packMask(self.owners[row] != UNDRAWN),
+                        _packMask(self.boxOwners[row] == Player.P1.value),
+                        _packMask(self.boxOwners[row] == Player.P2.value))
+
+    def playerToMove(self, row):
+        """
+        Get the Player to move in one game of the batch
+        """
+        return Player(int(self.players[row]))
+
+
+def playoutResults(position, player, games, rng, heuristic=True):
+    """
+    Play a position out many times at once and score the games the way MCTS scores a playout.
+
+    Parameters
+    ----------
+        position: Position
+            Position to play out from.
+
+        player: Player
+            Player to move.
+
+        games: int
+            Number of playouts.
+
+        rng: numpy.random.Generator
+            Source of random moves.
+
+        heuristic: bool
+            Whether the playouts prefer captures and safe moves.
+
+    Returns
+    -------
+        numpy.ndarray: 1 for every game P1 wins, 0 for every game P2 wins, 0.5 for a tie
+    """
+    margins = GameBatch.repeat(position, player, games).playOut(rng, heuristic)
+    return (np.sign(margins) + 1) / 2
+
+
+def estimateValue(position, player, games=BATCH_PLAYOUT_GAMES, seed=None):
+    """
+    Estimate how good a position is for P1 from a batch of heuristic playouts.
+
+    Parameters
+    ----------
+        position: Position
+            Position to estimate.
+
+        player: Player
+            Player to move.
+
+        games: int
+            Number of playouts.
+
+        seed: int
+            Seed for the playouts.
+
+    Returns
+    -------
+        (float, float): P1's share of the games won (ties count half) and P1's mean final margin
+    """
+    margins = GameBatch.repeat(position, player, games).playOut(np.random.default_rng(seed))
+    return float(((np.sign(margins) + 1) / 2).mean()), float(margins.mean())
+
+
+def randomPositions(count, moves, seed=None, heuristic=True):
+    """
+    Generate positions by playing random games from the empty board, for tests and benchmarks.
+
+    Parameters
+    ----------
+        count: int
+            Number of positions.
+
+        moves: int
+            Number of edges to draw in each game.
+
+        seed: int
+            Seed for the games.
+
+        heuristic: bool
+            Whether the games prefer captures and safe moves.
+
+    Returns
+    -------
+        list (Position, Player): Each position with the player to move
+    """
+    rng = np.random.default_rng(seed)
+    batch = GameBatch.repeat(Position(), Player.P1, count)
+    for _ in range(0, min(moves, EDGE_COUNT)):
+        batch.applyMoves(batch.chooseMoves(rng, heuristic))
+    return [(batch.toPosition(row), batch.playerToMove(row)) for row in range(0, count)]
@@ -0,0 +1,390 @@
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import Minimax
+from Board import Board
+from Chains import clearAnalysisCache
+from Constants import *
+from Gameplay import addNewEdgeFromMove
+from MoveOrdering import MoveOrderer
+from ParallelSearch import LazySMPSearch, ParallelSearch
+from Position import *
+from Vertex import Vertex
+
+# Benchmark positions as the edge indices (see Position) drawn from the empty board, P1 moving first and moving again
+# after completing a box. The middlegame has no three-sided boxes yet; the chain endgame has no safe moves left.
+CORPUS = {
+    "opening": (34, 146, 16, 67, 31, 130, 119, 125),
+    "middlegame": (14, 24, 22, 95, 47, 178, 83, 69, 164, 59, 166, 10, 160, 45, 123, 113, 145, 109, 158, 130, 150, 80,
+                   11, 8, 114, 151, 105, 133, 149, 61, 100, 34, 46, 44, 3, 37, 67, 39, 28, 108, 112, 87, 125, 159, 139,
+                   55, 118, 110, 148, 98, 173, 101, 119, 154, 60, 140, 170, 85, 86, 51),
+    "endgame": (60, 152, 140, 33, 96, 159, 124, 167, 154, 16, 164, 3, 126, 71, 155, 66, 53, 137, 165, 170, 141, 118, 41,
+                77, 44, 177, 122, 4, 19, 50, 12, 49, 134, 5, 156, 173, 48, 97, 119, 160, 87, 162, 100, 90, 174, 129, 105,
+                28, 89, 22, 9, 38, 148, 70, 83, 144, 103, 72, 99, 175, 65, 115, 73, 120, 142, 108, 178, 47, 109, 113,
+                169, 1, 151, 30, 116, 150, 27, 82, 147, 106, 110, 8, 20, 130, 92, 43, 34, 2, 131),
+}
+
+# Fixed search depths, by corpus position
+SEARCH_DEPTHS = {
+    "opening": 2,
+    "middlegame": 3,
+    "endgame": 4,
+}
+
+# Samples taken of every benchmark, and calls timed together in each sample, for the fast and the search benchmarks
+FAST_SAMPLES = 50
+FAST_REPEAT = 200
+SEARCH_SAMPLES = 5
+
+
+def replay(moves):
+    """
+    Play a move list from the empty board with addNewEdgeFromMove.
+
+    Parameters
+    ----------
+        moves: tuple int
+            Edge indices of the moves, in order.
+
+    Returns
+    -------
+        Board, Player: The Board after the moves and the player to move next
+    """
+    board = Board()
+    player = Player.P1
+    for edge in moves:
+        (x1, y1), (x2, y2) = EDGE_VERTICES[edge]
+        boxes = board.boxesP1 + board.boxesP2
+        success, error = addNewEdgeFromMove(board, player, Vertex(x1, y1), Vertex(x2, y2))
+        if not success:
+            raise ValueError(f'Move {edge} of the benchmark corpus is not legal: {error}')
+
+        # Completing a box means moving again
+        if board.boxesP1 + board.boxesP2 == boxes:
+            player = Player.P2 if player is Player.P1 else Player.P1
+    return board, player
+
+
+def resetSearch():
+    """
+    Empty the search's transposition table, move ordering and chain analysis cache, so every search starts cold
+    """
+    Minimax.transposition_table.clear()
+    Minimax.move_orderer = MoveOrderer()
+    clearAnalysisCache()
+
+
+def summarize(times, repeat):
+    """
+    Work out the statistics of a benchmark's samples.
+
+    Parameters
+    ----------
+        times: list float
+            Seconds taken by every sample.
+
+        repeat: int
+            Calls timed in every sample.
+
+    Returns
+    -------
+        dict: Mean, standard deviation, min and percentiles of the seconds per call
+    """
+    perCall = sorted(sample / repeat for sample in times)
+    percentiles = statistics.quantiles(perCall, n=100, method='inclusive')
+    return {
+        "mean": statistics.fmean(perCall),
+        "stdev": statistics.stdev(perCall),
+        "min": perCall[0],
+        "p50": statistics.median(perCall),
+        "p90": percentiles[89],
+        "p99": percentiles[98],
+        "samples": len(perCall),
+        "repeat": repeat,
+    }
+
+
+def timeBoardConstruction(repeat):
+    """
+    Time making empty Boards
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        Board()
+    return time.perf_counter() - start
+
+
+def timeGetOpenEdges(board, repeat):
+    """
+    Time listing the open edges of a Board
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        board.getOpenEdges()
+    return time.perf_counter() - start
+
+
+def timeAddNewEdgeFromMove(board, player, repeat):
+    """
+    Time adding moves to copies of a Board the way the agent adds the moves it reads. Every call gets a copy of its
+    own, made before the clock starts.
+    """
+    edges = board.getOpenEdges()
+    moves = [edges[call % len(edges)] for call in range(repeat)]
+    boards = [board.copy() for _ in range(repeat)]
+    vertices = [(edge.vertex1, edge.vertex2) for edge in moves]
+
+    start = time.perf_counter()
+    for copy, (vertex1, vertex2) in zip(boards, vertices):
+        addNewEdgeFromMove(copy, player, vertex1, vertex2)
+    return time.perf_counter() - start
+
+
+def timeEvaluateBoard(board, repeat):
+    """
+    Time evaluating a Board
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        Minimax.evaluateBoard(board)
+    return time.perf_counter() - start
+
+
+def timeMinimax(board, player, depth):
+    """
+    Time a cold fixed-depth minimax search of a Board
+    """
+    resetSearch()
+    position = board.toPosition()
+    moves = position.getOpenEdges()
+
+    start = time.perf_counter()
+    Minimax.minimax(position, moves, depth, player, -math.inf, math.inf)
+    return time.perf_counter() - start
+
+
+def timeIterativeDeepening(board, player, depth):
+    """
+    Time a cold iterative deepening search of a Board up to a fixed depth
+    """
+    resetSearch()
+
+    start = time.perf_counter()
+    Minimax.iterative_deepening(board, board.getOpenEdges(), depth, player, math.inf)
+    return time.perf_counter() - start
+
+
+def timeParallelSearch(board, player, depth, searchClass, workers):
+    """
+    Time a cold parallel search of a Board up to a fixed depth. Every call starts workers of its own, before the clock
+    starts, so their transposition tables are empty.
+    """
+    resetSearch()
+    search = searchClass(workers)
+    try:
+        start = time.perf_counter()
+        search.search(board, board.getOpenEdges(), depth, player, BENCH_TIME_LIMIT)
+        return time.perf_counter() - start
+    finally:
+        search.shutdown()
+
+
+def benchmarks(workers=SEARCH_WORKERS):
+    """
+    Get every benchmark of the suite.
+
+    Parameters
+    ----------
+        workers: int
+            Number of worker processes for the parallel search benchmarks.
+
+    Returns
+    -------
+        list (str, function, int, int): Name, function taking the number of calls to time and returning the seconds
+        they took, samples to take and calls per sample
+    """
+    suite = [("Board()", timeBoardConstruction, FAST_SAMPLES, FAST_REPEAT)]
+    for name, moves in CORPUS.items():
+        board, player = replay(moves)
+        depth = SEARCH_DEPTHS[name]
+        suite += [
+            (f"getOpenEdges[{name}]", lambda repeat, board=board: timeGetOpenEdges(board, repeat),
+             FAST_SAMPLES, FAST_REPEAT),
+            (f"addNewEdgeFromMove[{name}]",
+             lambda repeat, board=board, player=player: timeAddNewEdgeFromMove(board, player, repeat),
+             FAST_SAMPLES, FAST_REPEAT),
+            (f"evaluateBoard[{name}]", lambda repeat, board=board: timeEvaluateBoard(board, repeat),
+             FAST_SAMPLES, FAST_REPEAT),
+            (f"minimax[{name},depth={depth}]",
+             lambda repeat, board=board, player=player, depth=depth: timeMinimax(board, player, depth),
+             SEARCH_SAMPLES, 1),
+            (f"iterative_deepening[{name},depth={depth}]",
+             lambda repeat, board=board, player=player, depth=depth: timeIterativeDeepening(board, player, depth),
+             SEARCH_SAMPLES, 1),
+        ]
+        for searchClass in (ParallelSearch, LazySMPSearch):
+            suite.append((f"{searchClass.__name__}[{name},depth={depth},workers={workers}]",
+                          lambda repeat, board=board, player=player, depth=depth, searchClass=searchClass:
+                          timeParallelSearch(board, player, depth, searchClass, workers),
+                          SEARCH_SAMPLES, 1))
+    return suite
+
+
+def speedups(results):
+    """
+    Work out how much faster each parallel search benchmark ran than iterative_deepening on the same position.
+
+    Parameters
+    ----------
+        results: dict
+            Statistics of every benchmark by name, as in the results of runBenchmarks.
+
+    Returns
+    -------
+        dict: Ratio of the serial to the parallel median by parallel benchmark name
+    """
+    ratios = {}
+    for name, result in results.items():
+        if not name.startswith((ParallelSearch.__name__, LazySMPSearch.__name__)):
+            continue
+
+        # "ParallelSearch[middlegame,depth=3,workers=8]" is compared with "iterative_deepening[middlegame,depth=3]"
+        serial = results.get("iterative_deepening" + name[name.index("["):name.rindex(",")] + "]")
+        if serial is not None:
+            ratios[name] = serial["p50"] / result["p50"]
+    return ratios
+
+
+def environment():
+    """
+    Describe the machine and code the benchmarks ran on
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def runBenchmarks(pattern=None, scale=1.0, workers=SEARCH_WORKERS):
+    """
+    Run the benchmark suite.
+
+    Parameters
+    ----------
+        pattern: str
+            Only run benchmarks whose name contains this, or None to run them all.
+
+        scale: float
+            Multiplier for the number of samples taken (at least two are always taken).
+
+        workers: int
+            Number of worker processes for the parallel search benchmarks.
+
+    Returns
+    -------
+        dict: The environment, the statistics of every benchmark by name (in seconds per call) and the speedup of every
+        parallel search benchmark run alongside its serial one
+    """
+    results = {}
+    for name, benchmark, samples, repeat in benchmarks(workers):
+        if pattern is not None and pattern not in name:
+            continue
+
+        # One untimed call first, so imports and caches outside the search are warm
+        benchmark(1)
+        times = [benchmark(repeat) for _ in range(max(2, round(samples * scale)))]
+        results[name] = summarize(times, repeat)
+        print(f'{name:<45} mean {results[name]["mean"] * 1e6:12.2f} us   p50 {results[name]["p50"] * 1e6:12.2f} us')
+
+    ratios = speedups(results)
+    for name, ratio in ratios.items():
+        print(f'{name:<45} speedup {ratio:.2f}x over iterative_deepening')
+    return {"environment": environment(), "results": results, "speedups": ratios}
+
+
+def compareResults(results, baseline, threshold=BENCH_REGRESSION_THRESHOLD):
+    """
+    Compare benchmark results against a baseline by their medians, which are less thrown off by noise than the means.
+
+    Parameters
+    ----------
+        results: dict
+            Results of runBenchmarks.
+
+        baseline: dict
+            Earlier results of runBenchmarks to compare with.
+
+        threshold: float
+            How much slower (as a fraction of the baseline) a benchmark must be to count as a regression.
+
+    Returns
+    -------
+        list (str, float, float): Name, baseline and new median of every benchmark that regressed
+    """
+    regressions = []
+    for name, result in results["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+
+        change = result["p50"] / old["p50"] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        print(f'{name:<45} {old["p50"] * 1e6:12.2f} us -> {result["p50"] * 1e6:12.2f} us {change:+8.1%} {flag}')
+        if change > threshold:
+            regressions.append((name, old["p50"], result["p50"]))
+    return regressions
+
+
+def main():
+    """
+    Run the benchmark suite from the command line, exiting with status 1 if any benchmark regressed
+    """
+    parser = argparse.ArgumentParser(description="Benchmark SmartTeam's board and search code")
+    parser.add_argument("--output", type=str, default=BENCH_FILE, help="JSON file to write the results to")
+    parser.add_argument("--baseline", type=str, default=None, help="Results file to compare against")
+    parser.add_argument("--threshold", type=float, default=BENCH_REGRESSION_THRESHOLD,
+                        help="Slowdown (as a fraction) flagged as a regression")
+    parser.add_argument("--filter", type=str, default=None, help="Only run benchmarks whose name contains this")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for the number of samples")
+    parser.add_argument("--workers", type=int, default=SEARCH_WORKERS,
+                        help="Worker processes for the parallel search benchmarks")
+    args = parser.parse_args(sys.argv[1:])
+
+    results = runBenchmarks(args.filter, args.scale, args.workers)
+    with open(args.output, 'w') as resultsFile:
+        json.dump(results, resultsFile, indent=2)
+    print(f'Wrote {len(results["results"])} results to {args.output}')
+
+    if args.baseline is not None:
+        with open(args.baseline) as baselineFile:
+            baseline = json.load(baselineFile)
+        regressions = compareResults(results, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}')
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
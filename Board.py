@@ -1,57 +1,314 @@
-from collections import deque
-
 from Box import Box
 from Constants import *
+from Edge import Edge
+from Position import *
+
+# Stored owner values
+_NONE = Player.NONE.value
+_P1 = Player.P1.value
+_P2 = Player.P2.value
 
 
 class Board:
+    """
+    The game board. The topology (which edges bound which boxes, and where the vertices are) is the same for every
+    Board and lives in the shared tables in Position; a Board itself only holds small owner arrays and running totals,
+    so making or copying one is cheap. Edges and Boxes are views onto those arrays, made when first asked for.
+    """
 
     def __init__(self):
 
-        self.board = [
-            [Box(0, 0), Box(1, 0), Box(2, 0), Box(3, 0), Box(4, 0), Box(5, 0), Box(6, 0), Box(7, 0), Box(8, 0)],
-            [Box(0, 1), Box(1, 1), Box(2, 1), Box(3, 1), Box(4, 1), Box(5, 1), Box(6, 1), Box(7, 1), Box(8, 1)],
-            [Box(0, 2), Box(1, 2), Box(2, 2), Box(3, 2), Box(4, 2), Box(5, 2), Box(6, 2), Box(7, 2), Box(8, 2)],
-            [Box(0, 3), Box(1, 3), Box(2, 3), Box(3, 3), Box(4, 3), Box(5, 3), Box(6, 3), Box(7, 3), Box(8, 3)],
-            [Box(0, 4), Box(1, 4), Box(2, 4), Box(3, 4), Box(4, 4), Box(5, 4), Box(6, 4), Box(7, 4), Box(8, 4)],
-            [Box(0, 5), Box(1, 5), Box(2, 5), Box(3, 5), Box(4, 5), Box(5, 5), Box(6, 5), Box(7, 5), Box(8, 5)],
-            [Box(0, 6), Box(1, 6), Box(2, 6), Box(3, 6), Box(4, 6), Box(5, 6), Box(6, 6), Box(7, 6), Box(8, 6)],
-            [Box(0, 7), Box(1, 7), Box(2, 7), Box(3, 7), Box(4, 7), Box(5, 7), Box(6, 7), Box(7, 7), Box(8, 7)],
-            [Box(0, 8), Box(1, 8), Box(2, 8), Box(3, 8), Box(4, 8), Box(5, 8), Box(6, 8), Box(7, 8), Box(8, 8)]
-        ]
-        # Recursively add edges from the center box
-        self.board[4][4].findNeighbors(self.board)
+        # Owner (Player value) of every edge and box, and how many edges of every box have been claimed, by Position
+        # edge and box index
+        self.edgeOwners = bytearray(EDGE_COUNT)
+        self.boxOwners = bytearray(BOX_COUNT)
+        self.claimedEdges = bytearray(BOX_COUNT)
+
+        # Running totals used by evaluateBoard, kept up to date as edges are claimed
+        self.boxesP1 = 0
+        self.boxesP2 = 0
+        self.threeSided = 0
+
+        # Bit mask of unclaimed edges (by Position edge index), kept up to date as Edge owners change
+        self.openEdges = ALL_EDGES
+
+        # Moves made with makeMove, so they can be taken back with unmakeMove
+        self.undoStack = []
+
+        # Edge and Box views of this Board, by Position edge and box index
+        self.edgesById = [None] * EDGE_COUNT
+        self.boxesById = [None] * BOX_COUNT
+
+    def copy(self):
+        """
+        Get an independent copy of this Board (without its undo history)
+        """
+        board = Board.__new__(Board)
+        board.edgeOwners = self.edgeOwners[:]
+        board.boxOwners = self.boxOwners[:]
+        board.claimedEdges = self.claimedEdges[:]
+        board.boxesP1 = self.boxesP1
+        board.boxesP2 = self.boxesP2
+        board.threeSided = self.threeSided
+        board.openEdges = self.openEdges
+        board.undoStack = []
+        board.edgesById = [None] * EDGE_COUNT
+        board.boxesById = [None] * BOX_COUNT
+        return board
+
+    @property
+    def board(self):
+        """
+        The Boxes of this Board as nine rows of nine, for code that walks the grid
+        """
+        return [[self.getBox(boxIndex(col, row)) for col in range(0, BOARD_SIZE)] for row in range(0, BOARD_SIZE)]
 
     def printBoard(self):
         for row in range(0, 9):
             print()
             for col in range(0, 9):
-                self.board[row][col].toString()
+                self.getBox(boxIndex(col, row)).toString()
         print()
 
     def getOpenEdges(self):
         """
-        Iterates over the entire board and returns a list of all open edges: Meant to be used as a list of possible
-        moves for the minimax algorithm.
+        Returns a list of all open edges: Meant to be used as a list of possible moves for the minimax algorithm.
+        Read from the open edge mask the Board keeps up to date, so no scanning is needed.
 
         Returns
         -------
-            list Edge: List of open edges / available moves
+            list Edge: List of open edges / available moves, in Position edge index order
         """
 
-        edges = deque()
+        edges = []
 
-        # Iterate over every box
-        for row in range(0, 9):
-            for col in range(0, 9):
-                if self.board[row][col].northEdge.owner is Player.NONE and self.board[row][col].northEdge not in edges:
-                    edges.append(self.board[row][col].northEdge)
-                if self.board[row][col].eastEdge.owner is Player.NONE and self.board[row][col].eastEdge not in edges:
-                    edges.append(self.board[row][col].eastEdge)
-                if self.board[row][col].southEdge.owner is Player.NONE and self.board[row][col].southEdge not in edges:
-                    edges.append(self.board[row][col].southEdge)
-                if self.board[row][col].westEdge.owner is Player.NONE and self.board[row][col].westEdge not in edges:
-                    edges.append(self.board[row][col].westEdge)
+        # Walk the set bits of the open edge mask
+        remaining = self.openEdges
+        while remaining:
+            low = remaining & -remaining
+            edges.append(self.getEdge(low.bit_length() - 1))
+            remaining ^= low
 
         # Return list of open edges
         return edges
+
+    def setEdgeOwner(self, edge, owner):
+        """
+        Set the owner of an edge, keeping the open edge mask up to date. Boxes are not updated (see claimBoxEdges).
+
+        Parameters
+        ----------
+            edge: int
+                Index of the edge (see Position).
+
+            owner: Player
+                New owner of the edge.
+        """
+        self.edgeOwners[edge] = owner.value
+        if owner is Player.NONE:
+            self.openEdges |= 1 << edge
+        else:
+            self.openEdges &= ~(1 << edge)
+
+    def claimBoxEdges(self, edge):
+        """
+        Count an edge as claimed on the boxes it touches, giving any box it completes to the edge's owner.
+
+        Parameters
+        ----------
+            edge: int
+                Index of the edge (see Position).
+
+        Returns
+        -------
+            int: Number of boxes completed
+        """
+        owner = self.edgeOwners[edge]
+        completed = 0
+        for box in EDGE_BOXES[edge]:
+            claimed = self.claimedEdges[box]
+            if claimed == 3:
+                self.setBoxState(box, 4, owner)
+                completed += 1
+            elif claimed < 3:
+                self.setBoxState(box, claimed + 1, self.boxOwners[box])
+        return completed
+
+    def setBoxState(self, box, claimedEdges, owner):
+        """
+        Set a box's claimed edge count and owner, keeping the running totals up to date.
+
+        Parameters
+        ----------
+            box: int
+                Index of the box (see Position).
+
+            claimedEdges: int
+                Number of claimed edges.
+
+            owner: int
+                Player value of the owner.
+        """
+        oldClaimed = self.claimedEdges[box]
+        oldOwner = self.boxOwners[box]
+        self.claimedEdges[box] = claimedEdges
+        self.boxOwners[box] = owner
+        if claimedEdges != oldClaimed:
+            self.threeSided += (claimedEdges == 3) - (oldClaimed == 3)
+        if owner != oldOwner:
+            self.boxesP1 += (owner == _P1) - (oldOwner == _P1)
+            self.boxesP2 += (owner == _P2) - (oldOwner == _P2)
+
+    def makeMove(self, edge, player):
+        """
+        Claim an edge for a player in place, remembering enough to undo it with unmakeMove.
+
+        Parameters
+        ----------
+            edge: Edge
+                Edge of this Board to claim.
+
+            player: Player
+                Player making the move.
+
+        Returns
+        -------
+            int: Number of boxes completed by this move
+        """
+        index = edge.index
+
+        # Save the edge owner and each touching box's claim count and owner
+        boxes = [(box, self.claimedEdges[box], self.boxOwners[box]) for box in EDGE_BOXES[index]]
+        self.undoStack.append((index, self.edgeOwners[index], boxes))
+
+        # Claim the edge, counting boxes this move completed
+        self.setEdgeOwner(index, player)
+        return self.claimBoxEdges(index)
+
+    def unmakeMove(self):
+        """
+        Take back the last move made with makeMove.
+        """
+        edge, owner, boxes = self.undoStack.pop()
+        self.setEdgeOwner(edge, PLAYERS[owner])
+        for box, claimedEdges, boxOwner in boxes:
+            self.setBoxState(box, claimedEdges, boxOwner)
+
+    def getEdge(self, edge):
+        """
+        Get the Edge object for a Position edge index.
+
+        Parameters
+        ----------
+            edge: int
+                Index of the edge (see Position).
+
+        Returns
+        -------
+            Edge: The Board's Edge at that index
+        """
+        boardEdge = self.edgesById[edge]
+        if boardEdge is None:
+            boardEdge = self.edgesById[edge] = Edge(self, edge)
+        return boardEdge
+
+    def getBox(self, box):
+        """
+        Get the Box object for a Position box index.
+
+        Parameters
+        ----------
+            box: int
+                Index of the box (see Position).
+
+        Returns
+        -------
+            Box: The Board's Box at that index
+        """
+        boardBox = self.boxesById[box]
+        if boardBox is None:
+            y, x = divmod(box, BOARD_SIZE)
+            boardBox = self.boxesById[box] = Box(self, x, y)
+        return boardBox
+
+    def findEdge(self, vertex1, vertex2):
+        """
+        Look up the Edge between two vertices (in either order) and check whether it can be claimed.
+
+        Parameters
+        ----------
+            vertex1: Vertex
+                First vertex of the Edge.
+
+            vertex2: Vertex
+                Second vertex of the Edge.
+
+        Returns
+        -------
+            Edge, EdgeError: The Edge (None if there is no such Edge) and whether it is valid, out of bounds, not an
+            Edge or already claimed
+        """
+
+        # Is the move out of bounds?
+        if (vertex1.x < 0 or vertex1.x > 9 or
+                vertex1.y < 0 or vertex1.y > 9 or
+                vertex2.x < 0 or vertex2.x > 9 or
+                vertex2.y < 0 or vertex2.y > 9):
+            return None, EdgeError.EDGE_OOB
+
+        # Are these vertices the two ends of an Edge?
+        edge = EDGES_BY_VERTICES.get(((vertex1.x, vertex1.y), (vertex2.x, vertex2.y)))
+        if edge is None:
+            return None, EdgeError.EDGE_INVALID
+
+        # Has the Edge already been claimed?
+        if self.edgeOwners[edge] != _NONE:
+            return self.getEdge(edge), EdgeError.EDGE_CLAIMED
+
+        return self.getEdge(edge), EdgeError.EDGE_VALID
+
+    def toPosition(self):
+        """
+        Convert this Board into a compact Position for searching.
+
+        Returns
+        -------
+            Position: Position with the same drawn edges and box owners
+        """
+        edges = ALL_EDGES & ~self.openEdges
+        p1Boxes = 0
+        p2Boxes = 0
+        for box in range(0, BOX_COUNT):
+            owner = self.boxOwners[box]
+            if owner == _P1:
+                p1Boxes |= 1 << box
+            elif owner == _P2:
+                p2Boxes |= 1 << box
+        return Position(edges, p1Boxes, p2Boxes)
+
+    @staticmethod
+    def fromPosition(position):
+        """
+        Build a Board from a compact Position. Position does not record who drew each edge, so drawn edges are
+        credited to P1; box owners are restored from the Position.
+
+        Parameters
+        ----------
+            position: Position
+                Position to convert.
+
+        Returns
+        -------
+            Board: New Board with the same drawn edges and box owners
+        """
+        board = Board()
+        for edge in range(0, EDGE_COUNT):
+            if not position.isOpen(edge):
+                board.setEdgeOwner(edge, Player.P1)
+                board.claimBoxEdges(edge)
+        for box in range(0, BOX_COUNT):
+            if (position.p1Boxes >> box) & 1:
+                board.setBoxState(box, board.claimedEdges[box], _P1)
+            elif (position.p2Boxes >> box) & 1:
+                board.setBoxState(box, board.claimedEdges[box], _P2)
+        return board
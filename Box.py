@@ -1,49 +1,89 @@
 import sys
 
 from Constants import *
-from Edge import Edge
-from Vertex import Vertex
+from Position import *
+from Vertex import VERTICES
 
 
 class Box:
     """
-    An object representing a Box on the game board. Boxes keep track of their four Vertices, their four Edges, their Player (owner),
-    and how many of their edges have been claimed.
+    An object representing a Box on the game board. Boxes know their four Vertices, their four Edges, their Player (owner),
+    and how many of their edges have been claimed. A Box is a view onto its Board: the Vertices and Edges come from the
+    shared topology tables in Position, and the owner and claimed Edge count from the Board's arrays. Get Boxes from
+    Board.getBox rather than making them.
 
     Parameters
     ------------
+        gameBoard: Board
+            The Board this Box is on
         x: int
             This Box's x position on the game board
         y: int
             This Box's y position on the game board
     """
 
-    topLeft = None
-    bottomLeft = None
-    topRight = None
-    bottomRight = None
+    __slots__ = ('gameBoard', 'index', '__x', '__y')
 
-    owner = Player.NONE
-    northEdge = None
-    eastEdge = None
-    southEdge = None
-    westEdge = None
-    __x = -1
-    __y = -1
-
-    __claimedEdges = 0
-
-    def __init__(self, x, y):
+    def __init__(self, gameBoard, x, y):
+        self.gameBoard = gameBoard
+        self.index = boxIndex(x, y)
         self.__x = x
         self.__y = y
-        # Add vertices
-        self.topLeft = Vertex(x, y)
-        self.bottomLeft = Vertex(x, y + 1)
-        self.topRight = Vertex(x + 1, y)
-        self.bottomRight = Vertex(x + 1, y + 1)
+
+    @property
+    def topLeft(self):
+        return VERTICES[self.__y][self.__x]
+
+    @property
+    def bottomLeft(self):
+        return VERTICES[self.__y + 1][self.__x]
+
+    @property
+    def topRight(self):
+        return VERTICES[self.__y][self.__x + 1]
+
+    @property
+    def bottomRight(self):
+        return VERTICES[self.__y + 1][self.__x + 1]
+
+    @property
+    def northEdge(self):
+        return self.gameBoard.getEdge(BOX_EDGES[self.index][0])
+
+    @property
+    def eastEdge(self):
+        return self.gameBoard.getEdge(BOX_EDGES[self.index][1])
+
+    @property
+    def southEdge(self):
+        return self.gameBoard.getEdge(BOX_EDGES[self.index][2])
+
+    @property
+    def westEdge(self):
+        return self.gameBoard.getEdge(BOX_EDGES[self.index][3])
+
+    @property
+    def owner(self):
+        """
+        The Player who completed this Box (Player.NONE if nobody has yet)
+        """
+        return PLAYERS[self.gameBoard.boxOwners[self.index]]
 
     def getClaimedEdges(self):
-        return self.__claimedEdges
+        return self.gameBoard.claimedEdges[self.index]
+
+    def restoreClaimedEdges(self, claimedEdges, owner):
+        """
+        Put back this Box's claimed Edge count and owner, as saved before a move was made.
+
+        Parameters
+        ------------
+            claimedEdges: int
+                Number of claimed Edges to restore
+            owner: Player
+                Owner to restore
+        """
+        self.gameBoard.setBoxState(self.index, claimedEdges, owner.value)
 
     def printEdges(self):
         goNorth = self.northEdge == None
@@ -55,78 +95,6 @@ class Box:
             return
         sys.stdout.write(" ")
 
-    def findNeighbors(self, board):
-        """
-        Once the board has been initialized, locate all neighbors of this box.
-
-        Parameters
-        ------------
-            board: Board
-                The current game board
-        """
-        # Check which edges of are unclaimed
-        goNorth = self.northEdge is None
-        goEast = self.eastEdge is None
-        goSouth = self.southEdge is None
-        goWest = self.westEdge is None
-
-        # Go in these directions and add an edge w/ neighboring Box
-        if goNorth:
-            if self.__y == 0:
-                # Out of bounds
-                self.northEdge = Edge(self, None, self.topLeft, self.topRight)
-            else:
-                # Find box to north
-                northBox = board[self.__y - 1][self.__x]
-                # Find edge between
-                edgeBetween = Edge(self, northBox, self.topLeft, self.topRight)
-                self.northEdge = edgeBetween
-                northBox.southEdge = edgeBetween
-                # Search north box for adjacencies
-                northBox.findNeighbors(board)
-
-        if goEast:
-            if self.__x == 8:
-                # Out of bounds
-                self.eastEdge = Edge(self, None, self.topRight, self.bottomRight)
-            else:
-                # Find box to the east
-                eastBox = board[self.__y][self.__x + 1]
-                # Find edge between
-                edgeBetween = Edge(self, eastBox, self.topRight, self.bottomRight)
-                self.eastEdge = edgeBetween
-                eastBox.westEdge = edgeBetween
-                # Search east box for adjacencies
-                eastBox.findNeighbors(board)
-
-        if goSouth:
-            if self.__y == 8:
-                # Out of bounds
-                self.southEdge = Edge(self, None, self.bottomLeft, self.bottomRight)
-            else:
-                # Find box to south
-                southBox = board[self.__y + 1][self.__x]
-                # Find edge between
-                edgeBetween = Edge(self, southBox, self.bottomLeft, self.bottomRight)
-                self.southEdge = edgeBetween
-                southBox.northEdge = edgeBetween
-                # Search south box for adjacencies
-                southBox.findNeighbors(board)
-
-        if goWest:
-            if self.__x == 0:
-                # Out of bounds
-                self.westEdge = Edge(self, None, self.topLeft, self.bottomLeft)
-            else:
-                # Find box to west
-                westBox = board[self.__y][self.__x - 1]
-                # Find edge between
-                edgeBetween = Edge(self, westBox, self.topLeft, self.bottomLeft)
-                self.westEdge = edgeBetween
-                westBox.eastEdge = edgeBetween
-                # Search west box for adjacencies
-                westBox.findNeighbors(board)
-
     def setOwner(self, newOwner):
         """
         Set the owner of this Box
@@ -136,7 +104,7 @@ class Box:
             newOwner: Player
                 New Player to act as owner for this Box
         """
-        self.owner = newOwner
+        self.gameBoard.setBoxState(self.index, self.getClaimedEdges(), newOwner.value)
 
     def toString(self):
         """
@@ -159,10 +127,10 @@ class Box:
         ------------
             boolean: Whether this Box encompasses these two Vertices
         """
-        hasVertex1 = vertex1.equals(self.topLeft) or vertex1.equals(self.topRight) or vertex1.equals(
-            self.bottomLeft) or vertex1.equals(self.bottomRight)
-        hasVertex2 = vertex2.equals(self.topLeft) or vertex2.equals(self.topRight) or vertex2.equals(
-            self.bottomLeft) or vertex2.equals(self.bottomRight)
+        # Board Vertices are interned, so identity is equality
+        corners = (self.topLeft, self.topRight, self.bottomLeft, self.bottomRight)
+        hasVertex1 = vertex1 in corners
+        hasVertex2 = vertex2 in corners
         return hasVertex1 and hasVertex2
 
     def getEdgeWithVertices(self, vertex1, vertex2):
@@ -180,13 +148,13 @@ class Box:
         ------------
             Edge: Edge with these two vertices
         """
-        if vertex1.equals(self.topLeft) and vertex2.equals(self.topRight):
+        if vertex1 is self.topLeft and vertex2 is self.topRight:
             return self.northEdge
-        if vertex1.equals(self.bottomLeft) and vertex2.equals(self.bottomRight):
+        if vertex1 is self.bottomLeft and vertex2 is self.bottomRight:
             return self.southEdge
-        if vertex1.equals(self.topRight) and vertex2.equals(self.bottomRight):
+        if vertex1 is self.topRight and vertex2 is self.bottomRight:
             return self.eastEdge
-        if vertex1.equals(self.topLeft) and vertex2.equals(self.bottomLeft):
+        if vertex1 is self.topLeft and vertex2 is self.bottomLeft:
             return self.westEdge
 
     def claimEdge(self, edge):
@@ -198,28 +166,11 @@ class Box:
             edge: Edge
                 Edge to claim on this box
         """
-        # If we've already claimed 4 Edges, return
-        if self.__claimedEdges >= 4:
+        # If we've already claimed 4 Edges, or the Edge isn't one of ours, return
+        claimed = self.getClaimedEdges()
+        if claimed >= 4 or edge.index not in BOX_EDGES[self.index]:
             return
 
-        # Find the edge that matches and set owner accordingly
-        isNorth = edge.equals(self.northEdge)
-        isEast = edge.equals(self.eastEdge)
-        isSouth = edge.equals(self.southEdge)
-        isWest = edge.equals(self.westEdge)
-        if isNorth:
-            self.northEdge.owner = edge.owner
-            self.__claimedEdges += 1
-        elif isEast:
-            self.eastEdge.owner = edge.owner
-            self.__claimedEdges += 1
-        elif isSouth:
-            self.southEdge.owner = edge.owner
-            self.__claimedEdges += 1
-        elif isWest:
-            self.westEdge.owner = edge.owner
-            self.__claimedEdges += 1
-
         # Update box's owner if that was the last edge
-        if self.__claimedEdges == 4:
-            self.owner = edge.owner
+        owner = edge.owner if claimed == 3 else self.owner
+        self.gameBoard.setBoxState(self.index, claimed + 1, owner.value)
@@ -0,0 +1,407 @@
+from Constants import *
+from Position import *
+
+# What lies past the end of a chain
+GROUND = -1
+OPENED = -2
+
+# Shortest chain that is "long" (can't be taken without giving the opponent the chance to double-deal)
+LONG_CHAIN = 3
+
+
+class Component:
+    """
+    A chain or loop of boxes in the undrawn part of the board. Every box in it has two undrawn sides (or one, if the
+    component has already been opened), and consecutive boxes share an undrawn edge.
+
+    Parameters
+    ------------
+        isLoop: bool
+            Whether the boxes form a closed loop
+        boxes: list int
+            Box indices, in order along the component
+        edges: list int
+            Undrawn edge indices, in order along the component (for a chain, including the edges at both ends)
+        ends: (int, int)
+            What each end of a chain runs into: GROUND, OPENED (the end box has three sides drawn) or a junction box
+            index. (OPENED, OPENED) for a loop that has already been opened.
+    """
+
+    def __init__(self, isLoop, boxes, edges, ends):
+        self.isLoop = isLoop
+        self.boxes = boxes
+        self.edges = edges
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def isOpened(self):
+        """
+        Whether a move has already been made into this component, so its boxes can be captured
+        """
+        return OPENED in self.ends
+
+    def isLong(self):
+        """
+        Whether this is a loop or a chain of at least three boxes
+        """
+        return self.isLoop or len(self.boxes) >= LONG_CHAIN
+
+
+class ChainAnalysis:
+    """
+    Splits the undrawn region of a Position into chains and loops, and works out who has control of the endgame and
+    what it is worth to them (the controlled value).
+
+    Parameters
+    ------------
+        position: Position
+            Position to analyse
+    """
+
+    def __init__(self, position):
+        edges = position.edges
+
+        # Undrawn sides of every box still in play
+        self.openSides = {}
+        for box in range(0, BOX_COUNT):
+            sides = [edge for edge in BOX_EDGES[box] if not (edges >> edge) & 1]
+            if sides:
+                self.openSides[box] = sides
+
+        # Boxes with three or more undrawn sides are where chains meet
+        self.junctions = [box for box, sides in self.openSides.items() if len(sides) > 2]
+        self.capturable = sum(1 for sides in self.openSides.values() if len(sides) == 1)
+
+        # Safe moves draw no box's third side
+        self.safeMoves = []
+        remaining = ALL_EDGES & ~edges
+        while remaining:
+            low = remaining & -remaining
+            edge = low.bit_length() - 1
+            remaining ^= low
+            if all(len(self.openSides[box]) > 2 for box in EDGE_BOXES[edge]):
+                self.safeMoves.append(edge)
+
+        # Walk every chain and loop
+        self.components = []
+        visited = set()
+        for box, sides in self.openSides.items():
+            if box in visited or len(sides) > 2:
+                continue
+            component = self.__trace(box)
+            visited.update(component.boxes)
+            self.components.append(component)
+
+        unopened = [component for component in self.components if not component.isOpened()]
+        self.chains = sorted(len(component) for component in unopened if not component.isLoop)
+        self.loops = sorted(len(component) for component in unopened if component.isLoop)
+
+    def __neighbor(self, box, edge):
+        """
+        Get the box on the other side of an edge from box (GROUND if it is on the border)
+        """
+        for other in EDGE_BOXES[edge]:
+            if other != box:
+                return other
+        return GROUND
+
+    def __follow(self, start, edge):
+        """
+        Walk from a box out through one of its undrawn edges, across two-sided boxes, until the walk ends.
+
+        Returns
+        -------
+            list int, list int, int: Boxes passed (not including start), edges crossed, and what the walk ended at
+            (GROUND, OPENED, a junction box, or start itself for a loop)
+        """
+        boxes = []
+        edges = [edge]
+        previous = start
+        while True:
+            box = self.__neighbor(previous, edge)
+            if box == GROUND or box == start or len(self.openSides[box]) > 2:
+                return boxes, edges, box
+            boxes.append(box)
+            if len(self.openSides[box]) == 1:
+                return boxes, edges, OPENED
+            edge = self.openSides[box][0] if self.openSides[box][1] == edge else self.openSides[box][1]
+            edges.append(edge)
+            previous = box
+
+    def __trace(self, box):
+        """
+        Find the whole chain or loop containing a box with one or two undrawn sides
+        """
+        sides = self.openSides[box]
+
+        # An opened end: walk the only way there is
+        if len(sides) == 1:
+            boxes, edges, end = self.__follow(box, sides[0])
+            return Component(False, [box] + boxes, edges, (OPENED, end))
+
+        # Walk both ways
+        leftBoxes, leftEdges, leftEnd = self.__follow(box, sides[0])
+        if leftEnd == box:
+            return Component(True, [box] + leftBoxes, leftEdges, (GROUND, GROUND))
+        rightBoxes, rightEdges, rightEnd = self.__follow(box, sides[1])
+        return Component(False, leftBoxes[::-1] + [box] + rightBoxes, leftEdges[::-1] + rightEdges, (leftEnd, rightEnd))
+
+    def isLoony(self):
+        """
+        Whether no safe moves are left, so every move gives boxes away
+        """
+        return not self.safeMoves
+
+    def isSimple(self):
+        """
+        Whether the undrawn region is nothing but independent chains and loops (no junctions)
+        """
+        return not self.junctions
+
+    def shortChains(self):
+        """
+        Get the lengths of unopened chains that are too short to double-deal
+        """
+        return [length for length in self.chains if length < LONG_CHAIN]
+
+    def controlledValue(self):
+        """
+        Get the net number of boxes the player in control wins from the long chains and loops if they keep control to
+        the end: everything, less the two boxes given back per chain and four per loop, except on the last one.
+
+        Returns
+        -------
+            int: Controlled value (0 if there are no long chains or loops)
+        """
+        longChains = [length for length in self.chains if length >= LONG_CHAIN]
+        if not longChains and not self.loops:
+            return 0
+        value = sum(longChains) + sum(self.loops) - 4 * len(longChains) - 8 * len(self.loops)
+        # The player opening components saves a chain for last if there is one
+        return value + (4 if longChains else 8)
+
+    def controller(self, player):
+        """
+        Determine who has control once the safe moves have run out.
+
+        Parameters
+        ----------
+            player: Player
+                Player to move.
+
+        Returns
+        -------
+            Player: Player in control, or None while safe moves remain
+        """
+        if not self.isLoony():
+            return None
+
+        # Whoever can capture now can keep control by declining the last boxes
+        if self.capturable:
+            return player
+
+        # Short chains are handed over one by one, passing the move each time; whoever must then open the first long
+        # component is not in control
+        opponent = Player.P2 if player is Player.P1 else Player.P1
+        return opponent if len(self.shortChains()) % 2 == 0 else player
+
+    def projectedMargin(self, player):
+        """
+        Estimate how many more of the remaining boxes the player to move will end up with than their opponent, when
+        the position is a loony endgame with nothing to capture. Chains meeting at a junction are counted as separate
+        chains, and the junction boxes themselves are left out.
+
+        Parameters
+        ----------
+            player: Player
+                Player to move.
+
+        Returns
+        -------
+            int: Projected future box margin for player, or None if the position is not a quiet loony endgame
+        """
+        if not self.isLoony() or self.capturable:
+            return None
+
+        # Short chains are handed over alternately, shortest first
+        margin = 0
+        sign = -1
+        for length in self.shortChains():
+            margin += sign * length
+            sign = -sign
+
+        # Then whoever has to open a long component gives the controlled value away
+        return margin + sign * self.controlledValue()
+
+
+# Analyses are reused across the search, keyed on the drawn edges
+_analysisCache = {}
+
+
+def analyzePosition(position):
+    """
+    Get the (cached) ChainAnalysis of a Position
+    """
+    analysis = _analysisCache.get(position.edges)
+    if analysis is None:
+        if len(_analysisCache) >= CHAIN_CACHE_ENTRIES:
+            _analysisCache.clear()
+        analysis = ChainAnalysis(position)
+        _analysisCache[position.edges] = analysis
+    return analysis
+
+
+def clearAnalysisCache():
+    """
+    Forget every cached ChainAnalysis
+    """
+    _analysisCache.clear()
+
+
+def analyzeBoard(board):
+    """
+    Get the ChainAnalysis of a Board
+    """
+    return analyzePosition(board.toPosition())
+
+
+def chainEvaluation(position, player):
+    """
+    Evaluation term for Minimax: the projected future box margin for P1 in a quiet loony endgame.
+
+    Parameters
+    ----------
+        position: Position
+            Position to evaluate.
+
+        player: Player
+            Player to move.
+
+    Returns
+    -------
+        int: Projected future margin for P1 (0 when the position is not a quiet loony endgame)
+    """
+    if (ALL_EDGES & ~position.edges).bit_count() > CHAIN_ANALYSIS_EDGES:
+        return 0
+    margin = analyzePosition(position).projectedMargin(player)
+    if margin is None:
+        return 0
+    return margin if player is Player.P1 else -margin
+
+
+def chainMove(position, player):
+    """
+    Pick a move directly from the chain analysis when the position is a loony endgame and the move is certain:
+    capture what is on offer down to the last two boxes of a chain (or four of a loop), and once only independent
+    chains and loops are left, decline those last boxes or open the component that gives away least exactly as
+    EndgameSolver.componentValue says.
+
+    Parameters
+    ----------
+        position: Position
+            Current position.
+
+        player: Player
+            Player to move.
+
+    Returns
+    -------
+        int: Edge index of the move, or None if the analysis doesn't settle the move
+    """
+    analysis = analyzePosition(position)
+    if not analysis.isLoony() or not analysis.components:
+        return None
+
+    opened = [component for component in analysis.components if component.isOpened()]
+    if opened:
+        # Taking all but the boxes that could be handed back is never wrong, and of several opened components only
+        # the last can be worth declining
+        for component in opened:
+            if len(component) != _handback(component):
+                return _captureEdge(analysis, component)
+        if len(opened) > 1:
+            return _captureEdge(analysis, opened[0])
+
+        # Keeping control means handing the opponent the last boxes so that they must open the rest, which can only
+        # be valued exactly when the rest is nothing but chains and loops
+        component = opened[0]
+        rest = ChainAnalysis(_withoutComponent(position, component))
+        if not rest.isSimple():
+            return None
+        if -_componentValue(rest.chains, rest.loops) > _handback(component):
+            return _declineEdge(analysis, component)
+        return _captureEdge(analysis, component)
+
+    # Which component to open is only clear-cut when chains don't meet at junctions
+    if not analysis.isSimple():
+        return None
+
+    # Open the component that leaves the opponent least (short chains in the middle, so they can't be declined)
+    def opponentValue(component):
+        chains = list(analysis.chains)
+        loops = list(analysis.loops)
+        length = len(component)
+        if component.isLoop:
+            loops.remove(length)
+            rest = _componentValue(chains, loops)
+            return max(length + rest, length - 8 - rest)
+        chains.remove(length)
+        rest = _componentValue(chains, loops)
+        if length < LONG_CHAIN:
+            return length + rest
+        return max(length + rest, length - 4 - rest)
+
+    component = min(analysis.components, key=lambda component: (opponentValue(component), len(component)))
+    if component.isLong():
+        return component.edges[0]
+    return component.edges[len(component.edges) // 2]
+
+
+def _handback(component):
+    """
+    Get how many boxes declining an opened component hands the opponent: four of a loop, two of a chain
+    """
+    return 4 if component.ends == (OPENED, OPENED) else 2
+
+
+def _componentValue(chains, loops):
+    """
+    Get the exact value of a sum of chains and loops for the player who has to open one of them
+    """
+    # Endgame imports this module, so its solver is imported when first needed
+    from Endgame import endgame_solver
+    return endgame_solver.componentValue(tuple(chains), tuple(loops))
+
+
+def _captureEdge(analysis, component):
+    """
+    Get the edge that captures a box at an opened end of a component
+    """
+    box = component.boxes[0] if component.ends[0] == OPENED else component.boxes[-1]
+    return analysis.openSides[box][0]
+
+
+def _declineEdge(analysis, component):
+    """
+    Get the double-dealing move that leaves the last boxes of an opened component to the opponent
+    """
+    # Loop-like: split the remaining four boxes into two dominoes
+    if component.ends == (OPENED, OPENED):
+        return component.edges[len(component.edges) // 2]
+
+    # Chain: draw the far end, leaving the two boxes as a domino
+    if component.ends[0] == OPENED:
+        return component.edges[-1]
+    return component.edges[0]
+
+
+def _withoutComponent(position, component):
+    """
+    Get a copy of position with every box of a component completed, leaving the rest of the board
+    """
+    edges = position.edges
+    for box in component.boxes:
+        edges |= BOX_EDGE_MASKS[box]
+    return Position(edges)
@@ -3,6 +3,90 @@ from enum import Enum
 TEAM_NAME = "SmartTeam"
 SLEEP_TIME = 0.300
 TREE_DEPTH = 5
+ZOBRIST_SEED = 4341
+
+# Version of the evaluation, saved with search results kept on disk. Raise it whenever the evaluation's scores change,
+# so results scored by an older evaluation are thrown away rather than trusted
+EVALUATION_VERSION = 1
+TT_MAX_ENTRIES = 1 << 20
+
+# The referee forfeits a move after REFEREE_TIME_LIMIT seconds. Noticing our turn can take up to SLEEP_TIME, and the
+# margin covers reading / writing the move file and the last deadline check, so the search gets what is left.
+REFEREE_TIME_LIMIT = 10
+TIME_SAFETY_MARGIN = 1.5
+SEARCH_TIME_LIMIT = REFEREE_TIME_LIMIT - SLEEP_TIME - TIME_SAFETY_MARGIN
+
+# How many nodes minimax visits between checks of the clock
+DEADLINE_CHECK_NODES = 256
+
+# Worker processes for the root-parallel search (1 searches serially in the agent's process), and how long before the
+# deadline workers stop so their results are back in time
+SEARCH_WORKERS = 8
+PARALLEL_RESULT_MARGIN = 0.2
+
+# Seconds between checks of a parallel search's stop event while it waits for its workers
+PARALLEL_STOP_POLL = 0.01
+
+# Optional transposition table file kept between games (None to not use one, e.g. "SmartTeam.tt"): its size, slots per
+# bucket, and the shallowest search results worth saving to it
+PERSISTENT_TT_FILE = None
+PERSISTENT_TT_ENTRIES = 1 << 20
+PERSISTENT_TT_WAYS = 4
+PERSISTENT_TT_MIN_DEPTH = 3
+
+# Opening book consulted before searching (None to not use one), and how buildBook makes it: moves deep, opponent
+# moves sampled besides their best reply, how many moves deep opponent moves are sampled (only the best reply is
+# followed after that), and seconds searched per position of ours and per opponent position
+OPENING_BOOK_FILE = "SmartTeam.book"
+OPENING_BOOK_PLIES = 30
+OPENING_BOOK_REPLIES = 3
+OPENING_BOOK_BRANCH_PLIES = 6
+OPENING_BOOK_SEARCH_TIME = 10
+OPENING_BOOK_REPLY_SEARCH_TIME = 2
+
+# JSON Lines file that gets a record of every move SmartTeam makes, with its search statistics (None to not log)
+TELEMETRY_FILE = "SmartTeam.telemetry.jsonl"
+
+# Results file the benchmark suite (Bench.py) writes, and how much slower than the baseline a benchmark must be to be
+# flagged as a regression
+BENCH_FILE = "SmartTeam.bench.json"
+BENCH_REGRESSION_THRESHOLD = 0.10
+
+# Seconds the parallel search benchmarks give a search, which only bounds it (they stop at their fixed depth)
+BENCH_TIME_LIMIT = 3600
+
+# Monte Carlo tree search: UCT exploration constant, how many moves below the old root to look for the new one when
+# reusing the tree, and iterations between checks of the clock
+MCTS_EXPLORATION = 1.0
+MCTS_REUSE_DEPTH = 4
+MCTS_DEADLINE_CHECK_ITERATIONS = 16
+
+# Games per batch of vectorized playouts (BatchPlayout), and playouts per MCTS iteration (1 plays out one game at a
+# time without NumPy)
+BATCH_PLAYOUT_GAMES = 256
+MCTS_BATCH_PLAYOUTS = 1
+
+# Whether to search while waiting for the opponent, in slices of PONDER_SLICE seconds up to PONDER_MAX_DEPTH
+PONDERING = True
+PONDER_SLICE = 0.5
+PONDER_MAX_DEPTH = 10
+
+# Number of slots in the transposition table Lazy SMP workers share
+SHARED_TT_ENTRIES = 1 << 20
+
+# Most quiescence nodes a search may visit below any one depth-limit leaf
+QUIESCENCE_NODE_LIMIT = 5000
+
+# Chain analysis is only used in evaluation once this few edges are left, and caches this many analyses
+CHAIN_ANALYSIS_EDGES = 60
+CHAIN_CACHE_ENTRIES = 1 << 16
+
+# The exact endgame solver takes over once this few edges are left (or no safe moves are), gets this much of the
+# search time before minimax is used instead, and memoizes this many positions
+ENDGAME_SOLVER_EDGES = 24
+ENDGAME_TIME_LIMIT = SEARCH_TIME_LIMIT / 2
+ENDGAME_MEMO_ENTRIES = 1 << 20
+ENDGAME_DEADLINE_CHECK_NODES = 256
 
 
 class Player(Enum):
@@ -15,6 +99,10 @@ class Player(Enum):
     P2 = 2
 
 
+# Players by value, for turning stored owner values back into Players
+PLAYERS = tuple(Player)
+
+
 class TurnType(Enum):
     """
     Used when determining what type of move to make.
@@ -35,3 +123,39 @@ class EdgeError(Enum):
     EDGE_OOB = 2
     EDGE_CLAIMED = 3
     EDGE_PASS = 4
+
+
+class Bound(Enum):
+    """
+    Used to mark how a transposition table score relates to the true score of a position.
+    """
+
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+
+class ParallelMode(Enum):
+    """
+    Used to choose how the worker processes split a parallel search.
+    """
+
+    ROOT_SPLIT = 0
+    LAZY_SMP = 1
+
+
+# How the worker processes split the search
+PARALLEL_MODE = ParallelMode.ROOT_SPLIT
+
+
+class Engine(Enum):
+    """
+    Used to choose which search engine picks our moves.
+    """
+
+    MINIMAX = 0
+    MCTS = 1
+
+
+# Search engine SmartTeam uses
+ENGINE = Engine.MINIMAX
@@ -1,31 +1,66 @@
 from Constants import *
+from Position import *
+from Vertex import VERTICES
 
 
 class Edge:
     """
-    An object representing the line between two vertices. Edges keep track of their owners,
-    their two Vertices, and the two (or one if on the outside of the board) Boxes that they touch.
+    An object representing the line between two vertices. Edges know their owners, their two Vertices, and the two
+    (or one if on the outside of the board) Boxes that they touch. An Edge is a view onto its Board: the Vertices and
+    Boxes come from the shared topology tables in Position and the owner from the Board's edge owner array. Get Edges
+    from Board.getEdge rather than making them.
 
     Parameters
     ------------
-        box1: Box
-            The first adjacent box
-        box2: Box
-            The second adjacent box
-        vertex1: Vertex
-            The first vertex making up this Edge
-        vertex2: Vertex
-            The second vertex making up this Edge
+        gameBoard: Board
+            The Board this Edge is on
+        index: int
+            Position edge index of this Edge
     """
-    owner = Player.NONE
-    vertex1 = None
-    vertex2 = None
 
-    def __init__(self, box1, box2, vertex1, vertex2):
-        self.box1 = box1
-        self.box2 = box2
-        self.vertex1 = vertex1
-        self.vertex2 = vertex2
+    __slots__ = ('gameBoard', 'index')
+
+    def __init__(self, gameBoard, index):
+        self.gameBoard = gameBoard
+        self.index = index
+
+    @property
+    def owner(self):
+        """
+        The Player who claimed this Edge (Player.NONE if unclaimed)
+        """
+        return PLAYERS[self.gameBoard.edgeOwners[self.index]]
+
+    @property
+    def vertex1(self):
+        """
+        The first (top or left) Vertex of this Edge
+        """
+        x, y = EDGE_VERTICES[self.index][0]
+        return VERTICES[y][x]
+
+    @property
+    def vertex2(self):
+        """
+        The second (bottom or right) Vertex of this Edge
+        """
+        x, y = EDGE_VERTICES[self.index][1]
+        return VERTICES[y][x]
+
+    @property
+    def box1(self):
+        """
+        The first Box this Edge touches
+        """
+        return self.gameBoard.getBox(EDGE_BOXES[self.index][0])
+
+    @property
+    def box2(self):
+        """
+        The second Box this Edge touches (None on the outside of the board)
+        """
+        boxes = EDGE_BOXES[self.index]
+        return self.gameBoard.getBox(boxes[1]) if len(boxes) > 1 else None
 
     def setOwner(self, newOwner):
         """
@@ -36,7 +71,7 @@ class Edge:
             newOwner: Player
                 New Player to act as owner for this Edge
         """
-        self.owner = newOwner
+        self.gameBoard.setEdgeOwner(self.index, newOwner)
 
     def equals(self, other):
         """
@@ -51,6 +86,8 @@ class Edge:
         ------------
             boolean: Whether these Edges are equal
         """
+        if self is other:
+            return True
         v1 = self.vertex1.equals(other.vertex1)
         v2 = self.vertex2.equals(other.vertex2)
         return v1 and v2
@@ -91,22 +128,14 @@ class Edge:
         ------------
             Edge: The Board's Edge at requested position
         """
-        # Find the two boxes that this Edge touches
-        for row in board:
-            for box in row:
-                if box.hasVertices(vertex1, vertex2):
-                    # We only need the edge from box1 becuase box2 may not exist but they should be the same Edge either way
-                    return box.getEdgeWithVertices(vertex1, vertex2)
-
-        # If edge does not exist
-        return None
+        # Look the vertex pair up in the shared index (None if the edge does not exist)
+        edge = EDGES_BY_VERTICES.get(((vertex1.x, vertex1.y), (vertex2.x, vertex2.y)))
+        return None if edge is None else board.getEdge(edge)
 
     def addToBoard(self):
         """
         Place this edge on the board by updating box owners
         """
 
-        # Since boxes share an edge, we need to call claim on both children in order to accurately update counts
-        self.box1.claimEdge(self)
-        if self.box2 is not None:
-            self.box2.claimEdge(self)
+        # Since boxes share an edge, both of them count it as claimed
+        self.gameBoard.claimBoxEdges(self.index)
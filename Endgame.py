@@ -0,0 +1,299 @@
+import math
+import time
+
+from Chains import ChainAnalysis, LONG_CHAIN
+from Constants import *
+from Position import *
+
+
+class SolverTimeout(Exception):
+    """
+    Raised inside the endgame solver when its deadline passes.
+    """
+    pass
+
+
+class EndgameSolver:
+    """
+    Exact solver for the end of the game. Values are the number of remaining boxes the player to move wins minus the
+    number their opponent wins, with perfect play on both sides (completing a box earns another move).
+
+    The search is negamax with alpha-beta over the drawn-edge mask, with a memo table of bounds keyed on that mask. Two
+    results from the theory of the game keep it small:
+        - When a box can be taken, only taking it or the double-dealing move next to it need to be tried, and a box
+          whose capture doesn't touch a two-sided box is simply taken.
+        - Once there are no safe moves, nothing to capture and no junctions, the position is a sum of independent chains
+          and loops. Its value then follows from Berlekamp's analysis (the opponent of whoever opens a component either
+          takes it all or declines the last two boxes of a chain / four of a loop), memoized on the component lengths.
+
+    Parameters
+    ------------
+        maxEntries: int
+            Number of positions to memoize before the memo table is cleared and starts over
+    """
+
+    def __init__(self, maxEntries=ENDGAME_MEMO_ENTRIES):
+        self.maxEntries = maxEntries
+        self.memo = {}
+        self.componentMemo = {}
+        self.deadline = math.inf
+        self.nodes = 0
+
+    def componentValue(self, chains, loops):
+        """
+        Value of a sum of independent chains and loops for the player who has to open one of them.
+
+        Parameters
+        ----------
+            chains: tuple int
+                Sorted chain lengths.
+
+            loops: tuple int
+                Sorted loop lengths.
+
+        Returns
+        -------
+            int: Net boxes for the player to move
+        """
+        if not chains and not loops:
+            return 0
+
+        key = (chains, loops)
+        value = self.componentMemo.get(key)
+        if value is not None:
+            return value
+
+        best = -math.inf
+
+        # Open a chain (short ones in the middle, so they can't be declined)
+        for i, length in enumerate(chains):
+            if i > 0 and chains[i - 1] == length:
+                continue
+            rest = self.componentValue(chains[:i] + chains[i + 1:], loops)
+            if length < LONG_CHAIN:
+                opponent = length + rest
+            else:
+                opponent = max(length + rest, length - 4 - rest)
+            best = max(best, -opponent)
+
+        # Open a loop
+        for i, length in enumerate(loops):
+            if i > 0 and loops[i - 1] == length:
+                continue
+            rest = self.componentValue(chains, loops[:i] + loops[i + 1:])
+            opponent = max(length + rest, length - 8 - rest)
+            best = max(best, -opponent)
+
+        self.componentMemo[key] = best
+        return best
+
+    def candidateMoves(self, edges):
+        """
+        Get the moves worth trying in a position, or its value when it can be read off directly.
+
+        Parameters
+        ----------
+            edges: int
+                Drawn edge mask.
+
+        Returns
+        -------
+            list int, int: Moves to try (best first) and None, or None and the value of the position
+        """
+        openEdges = ALL_EDGES & ~edges
+
+        # Drawn sides of every box still in play
+        sides = {}
+        for box in range(0, BOX_COUNT):
+            count = (edges & BOX_EDGE_MASKS[box]).bit_count()
+            if count < 4:
+                sides[box] = count
+
+        # Capturable boxes: take one outright if that can't matter, otherwise try taking or declining
+        moves = []
+        for box, count in sides.items():
+            if count != 3:
+                continue
+            edge = (BOX_EDGE_MASKS[box] & openEdges).bit_length() - 1
+            neighbor = None
+            for other in EDGE_BOXES[edge]:
+                if other != box:
+                    neighbor = other
+            if neighbor is None or sides[neighbor] != 2:
+                return [edge], None
+            farEdge = (BOX_EDGE_MASKS[neighbor] & openEdges & ~(1 << edge)).bit_length() - 1
+            for move in (edge, farEdge):
+                if move not in moves:
+                    moves.append(move)
+        if moves:
+            return moves, None
+
+        # Safe moves first, then sacrifices
+        safe = []
+        sacrifices = []
+        remaining = openEdges
+        while remaining:
+            low = remaining & -remaining
+            edge = low.bit_length() - 1
+            remaining ^= low
+            if all(sides[box] < 2 for box in EDGE_BOXES[edge]):
+                safe.append(edge)
+            else:
+                sacrifices.append(edge)
+
+        # Nothing but independent chains and loops left
+        if not safe and all(count == 2 for count in sides.values()):
+            analysis = ChainAnalysis(Position(edges))
+            return None, self.componentValue(tuple(analysis.chains), tuple(analysis.loops))
+
+        return safe + sacrifices, None
+
+    def moveValue(self, edges, move, alpha, beta):
+        """
+        Value of making a move, for the player making it.
+        """
+        child = edges | (1 << move)
+        completed = 0
+        for box in EDGE_BOXES[move]:
+            mask = BOX_EDGE_MASKS[box]
+            if child & mask == mask:
+                completed += 1
+
+        # Completing a box means moving again; otherwise the opponent moves
+        if completed:
+            return completed + self.value(child, alpha - completed, beta - completed)
+        return -self.value(child, -beta, -alpha)
+
+    def value(self, edges, alpha=-math.inf, beta=math.inf):
+        """
+        Value of a position for the player to move, searched within an alpha-beta window.
+
+        Parameters
+        ----------
+            edges: int
+                Drawn edge mask.
+
+            alpha: int
+                Lowest value of interest.
+
+            beta: int
+                Highest value of interest.
+
+        Returns
+        -------
+            int: Net boxes for the player to move (exact if it lies inside the window, otherwise a bound)
+        """
+        if edges == ALL_EDGES:
+            return 0
+
+        self.nodes += 1
+        if self.nodes % ENDGAME_DEADLINE_CHECK_NODES == 0 and time.time() >= self.deadline:
+            raise SolverTimeout()
+
+        # Stored bounds
+        lower, upper = self.memo.get(edges, (-math.inf, math.inf))
+        if lower == upper or lower >= beta:
+            return lower
+        if upper <= alpha:
+            return upper
+        alpha = max(alpha, lower)
+        beta = min(beta, upper)
+        alphaOriginal = alpha
+
+        moves, value = self.candidateMoves(edges)
+        if moves is None:
+            self.store(edges, value, value)
+            return value
+
+        best = -math.inf
+        for move in moves:
+            best = max(best, self.moveValue(edges, move, alpha, beta))
+            alpha = max(alpha, best)
+            if alpha >= beta:
+                break
+
+        if best <= alphaOriginal:
+            self.store(edges, lower, best)
+        elif best >= beta:
+            self.store(edges, best, upper)
+        else:
+            self.store(edges, best, best)
+        return best
+
+    def store(self, edges, lower, upper):
+        """
+        Save bounds on the value of a position
+        """
+        if edges not in self.memo and len(self.memo) >= self.maxEntries:
+            self.memo.clear()
+        self.memo[edges] = (lower, upper)
+
+    def bestMove(self, edges, deadline=math.inf):
+        """
+        Find the best move in a position.
+
+        Parameters
+        ----------
+            edges: int
+                Drawn edge mask.
+
+            deadline: float
+                Time (from time.time()) by which to give up with SolverTimeout.
+
+        Returns
+        -------
+            int, int: Value of the position for the player to move and the edge index of a best move
+        """
+        self.deadline = deadline
+        try:
+            moves, _ = self.candidateMoves(edges)
+            if moves is None:
+                # Any opening move can be best; try them all
+                moves = Position(edges).getOpenEdges()
+
+            bestValue, bestMove = -math.inf, None
+            for move in moves:
+                value = self.moveValue(edges, move, bestValue, math.inf)
+                if value > bestValue:
+                    bestValue, bestMove = value, move
+            return bestValue, bestMove
+        finally:
+            self.deadline = math.inf
+
+
+# Memo tables are kept between moves: a position's value doesn't depend on how it was reached
+endgame_solver = EndgameSolver()
+
+
+def endgameMove(boardState, player, time_limit):
+    """
+    Solve the endgame exactly if it is small enough (at most ENDGAME_SOLVER_EDGES open edges, or no safe moves left)
+    and can be solved within the time limit.
+
+    Parameters
+    ----------
+        boardState: Board
+            Current game board.
+
+        player: Player
+            Player to move.
+
+        time_limit: float
+            Seconds the solver may take.
+
+    Returns
+    -------
+        Edge: Best move on boardState, or None if the position wasn't solved
+    """
+    position = boardState.toPosition()
+    openCount = (ALL_EDGES & ~position.edges).bit_count()
+    if openCount == 0:
+        return None
+    if openCount > ENDGAME_SOLVER_EDGES and ChainAnalysis(position).safeMoves:
+        return None
+
+    try:
+        value, move = endgame_solver.bestMove(position.edges, time.time() + time_limit)
+    except SolverTimeout:
+        return None
+    return boardState.getEdge(move)
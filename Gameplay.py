@@ -2,7 +2,6 @@ import os
 import time
 
 from Constants import *
-from Edge import Edge
 
 
 def awaitTurn():
@@ -42,7 +41,7 @@ def addNewEdgeFromMove(board, player, vertex1, vertex2):
 
     Parameters
     ----------
-        board: arr arr Box
+        board: Board
             Board to add move to.
 
         player: Player
@@ -64,22 +63,10 @@ def addNewEdgeFromMove(board, player, vertex1, vertex2):
         # Return as if successful, but don't add to board
         return True, EdgeError.EDGE_PASS
 
-    # Is the move out of bounds?
-    if (vertex1.x < 0 or vertex1.x > 9 or
-            vertex1.y < 0 or vertex1.y > 9 or
-            vertex2.x < 0 or vertex2.x > 9 or
-            vertex2.y < 0 or vertex2.y > 9):
-        # Return Out of Bounds Error
-        return False, EdgeError.EDGE_OOB
-
-    # Make new edge
-    edge = Edge.getEdgeFromBoard(board, vertex1, vertex2)
-
-    # If edge is null, it doesn't exist
-    if edge is None:
-        return False, EdgeError.EDGE_INVALID
-
-    # Check if edge is claimed
+    # Find the edge: out of bounds, nonexistent and claimed edges are all errors
+    edge, error = board.findEdge(vertex1, vertex2)
+    if error is not EdgeError.EDGE_VALID:
+        return False, error
 
     # Set owner and add to board
     edge.setOwner(player)
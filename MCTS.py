@@ -0,0 +1,350 @@
+import math
+import random
+import time
+
+import numpy as np
+
+from BatchPlayout import playoutResults
+from Chains import chainMove
+from Constants import *
+from Minimax import captureMoves
+from Position import *
+
+
+class Node:
+    """
+    A node of the Monte Carlo search tree: the position reached by a move.
+
+    Parameters
+    ------------
+        move: int
+            Edge index of the move leading here (None at the root)
+        mover: Player
+            Player who made that move
+        player: Player
+            Player to move here
+        key: int
+            Zobrist key of the position here, with the player to move
+        parent: Node
+            Node the move was made from
+        untried: list int
+            Edge indices of moves not yet expanded
+    """
+
+    __slots__ = ('move', 'mover', 'player', 'key', 'parent', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, move, mover, player, key, parent, untried):
+        self.move = move
+        self.mover = mover
+        self.player = player
+        self.key = key
+        self.parent = parent
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+
+        # Playouts won by mover (a tie counts half)
+        self.wins = 0.0
+
+    def selectChild(self, exploration):
+        """
+        Pick the child with the best UCT score
+        """
+        logVisits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits
+                   + exploration * math.sqrt(logVisits / child.visits))
+
+
+def treeMoves(position):
+    """
+    Get the moves the tree expands in a position, pruned the same way as the playouts: the captures quiescence would
+    try if there are boxes to take, otherwise the safe moves, otherwise every move.
+
+    Parameters
+    ----------
+        position: Position
+            Position to expand.
+
+    Returns
+    -------
+        list int: Edge indices to try
+    """
+    if position.countThreeSided():
+        return captureMoves(position)
+    openEdges = position.getOpenEdges()
+    safe = [edge for edge in openEdges if all(position.sidesDrawn(box) < 2 for box in EDGE_BOXES[edge])]
+    return safe if safe else openEdges
+
+
+def playout(position, player, rng):
+    """
+    Play a game out from a position with a fast heuristic policy: take a box whenever one is there, otherwise make a
+    random safe move, otherwise a random move.
+
+    Parameters
+    ----------
+        position: Position
+            Position to play out from (left unchanged).
+
+        player: Player
+            Player to move.
+
+        rng: random.Random
+            Source of random moves.
+
+    Returns
+    -------
+        float: 1 if P1 ends up with more boxes, 0 if P2 does, 0.5 for a tie
+    """
+    edges = position.edges
+    drawn = bytearray(EDGE_COUNT)
+    openEdges = []
+    for edge in range(0, EDGE_COUNT):
+        if (edges >> edge) & 1:
+            drawn[edge] = 1
+        else:
+            openEdges.append(edge)
+    rng.shuffle(openEdges)
+
+    sides = [(edges & mask).bit_count() for mask in BOX_EDGE_MASKS]
+    capturable = [box for box in range(0, BOX_COUNT) if sides[box] == 3]
+    margin = position.p1Boxes.bit_count() - position.p2Boxes.bit_count()
+
+    # Safe moves stay unsafe once they're not, so one pass over the shuffled edges finds them all
+    nextSafe = 0
+    unsafe = []
+    remaining = len(openEdges)
+
+    while remaining:
+        move = None
+
+        # Take a box if there is one
+        while capturable and move is None:
+            box = capturable.pop()
+            if sides[box] == 3:
+                for edge in BOX_EDGES[box]:
+                    if not drawn[edge]:
+                        move = edge
+
+        # Otherwise a safe move
+        while move is None and nextSafe < len(openEdges):
+            edge = openEdges[nextSafe]
+            nextSafe += 1
+            if drawn[edge]:
+                continue
+            if all(sides[box] < 2 for box in EDGE_BOXES[edge]):
+                move = edge
+            else:
+                unsafe.append(edge)
+
+        # Otherwise anything
+        while move is None:
+            edge = unsafe.pop(rng.randrange(len(unsafe)))
+            if not drawn[edge]:
+                move = edge
+
+        drawn[move] = 1
+        remaining -= 1
+        completed = 0
+        for box in EDGE_BOXES[move]:
+            sides[box] += 1
+            if sides[box] == 3:
+                capturable.append(box)
+            elif sides[box] == 4:
+                completed += 1
+
+        if completed:
+            margin += completed if player is Player.P1 else -completed
+        else:
+            player = Player.P2 if player is Player.P1 else Player.P1
+
+    if margin > 0:
+        return 1.0
+    return 0.0 if margin < 0 else 0.5
+
+
+class MonteCarloTreeSearch:
+    """
+    Monte Carlo tree search (UCT) engine, an alternative to Minimax that can stop at any time and copes better with the
+    huge number of safe moves early in the game. Each iteration walks down the tree by UCT score, expands one move
+    (see treeMoves), plays the rest of the game out with the fast playout policy and updates the win counts on the way
+    back up. The tree is kept between turns: the next search starts from the node for the position it is given, if the
+    tree reached it.
+
+    Same interface as ParallelSearch, including the statistics of the last search.
+
+    Parameters
+    ------------
+        exploration: float
+            UCT exploration constant
+        seed: int
+            Seed for the playouts
+        batch: int
+            Playouts per iteration: above 1, the new leaf is played out that many times at once with BatchPlayout
+    """
+
+    def __init__(self, exploration=MCTS_EXPLORATION, seed=None, batch=MCTS_BATCH_PLAYOUTS):
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.batchRng = np.random.default_rng(seed)
+        self.batch = batch
+        self.root = None
+        self.iterations = 0
+        self.statistics = None
+
+    def shutdown(self):
+        """
+        Nothing to stop: the search runs in this process
+        """
+        pass
+
+    def findRoot(self, key):
+        """
+        Find the node for a position in the kept tree, searching down to MCTS_REUSE_DEPTH moves below the old root.
+
+        Parameters
+        ----------
+            key: int
+                Zobrist key of the position with the player to move.
+
+        Returns
+        -------
+            Node: The node, or None if the tree didn't reach the position
+        """
+        if self.root is None:
+            return None
+        level = [self.root]
+        for _ in range(0, MCTS_REUSE_DEPTH + 1):
+            nextLevel = []
+            for node in level:
+                if node.key == key:
+                    return node
+                nextLevel.extend(node.children)
+            level = nextLevel
+        return None
+
+    def search(self, boardState, nextMoves, max_depth, player, time_limit, stop=None):
+        """
+        Search until the time limit is used up or stop is set, and pick the most visited move.
+
+        Parameters
+        ----------
+            boardState: Board
+                Current game board.
+
+            nextMoves: list Edge
+                List of open edges / available moves.
+
+            max_depth: int
+                Unused (the tree grows as deep as the playouts lead it).
+
+            player: Player
+                Player to move.
+
+            time_limit: float
+                Seconds the search may take.
+
+            stop: threading.Event
+                Event that stops the search once set, or None.
+
+        Returns
+        -------
+            Edge: Best move found on boardState
+        """
+        start = time.time()
+        deadline = start + time_limit
+        self.statistics = None
+        position = boardState.toPosition()
+        rootMoves = [edge.index for edge in nextMoves]
+        if not rootMoves:
+            return None
+
+        # Chain endgames are played straight from the chain analysis
+        shortcut = chainMove(position, player)
+        if shortcut is not None and shortcut in rootMoves:
+            return boardState.getEdge(shortcut)
+
+        # Start from the kept tree if it reached this position
+        key = position.hashKey(player)
+        root = self.findRoot(key)
+        if root is None:
+            moves = [move for move in treeMoves(position) if move in rootMoves]
+            root = Node(None, None, player, key, None, position.uniqueMoves(moves or rootMoves))
+        root.parent = None
+        self.root = root
+
+        self.iterations = 0
+        reusedVisits = root.visits
+        while True:
+            if self.iterations % MCTS_DEADLINE_CHECK_ITERATIONS == 0:
+                if time.time() >= deadline or (stop is not None and stop.is_set()):
+                    break
+            self.iterations += 1
+            self.iterate(position)
+
+        # The most visited line stands in for the principal variation
+        pv = []
+        node = root
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            pv.append(node.move)
+        seconds = time.time() - start
+        self.statistics = {
+            "depth": len(pv),
+            "seconds": round(seconds, 4),
+            "iterations": self.iterations,
+            "playouts": root.visits - reusedVisits,
+            "reused_playouts": reusedVisits,
+            "playouts_per_second": round((root.visits - reusedVisits) / seconds) if seconds > 0 else None,
+            "pv": pv,
+        }
+
+        if not root.children:
+            return boardState.getEdge(rootMoves[0])
+        best = max(root.children, key=lambda child: child.visits)
+        return boardState.getEdge(best.move)
+
+    def iterate(self, position):
+        """
+        Run one select / expand / playout / update iteration from the root (position is left unchanged).
+        """
+        node = self.root
+        player = node.player
+        made = 0
+
+        # Walk down through fully expanded nodes
+        while not node.untried and node.children:
+            node = node.selectChild(self.exploration)
+            position.makeMove(node.move, player)
+            player = node.player
+            made += 1
+
+        # Expand one move
+        if node.untried:
+            move = node.untried.pop(self.rng.randrange(len(node.untried)))
+            completed = position.makeMove(move, player)
+            mover = player
+            if not completed:
+                player = Player.P2 if player is Player.P1 else Player.P1
+            child = Node(move, mover, player, position.hashKey(player), node, treeMoves(position))
+            node.children.append(child)
+            node = child
+            made += 1
+
+        # Play out and update
+        if self.batch > 1:
+            playouts = self.batch
+            result = float(playoutResults(position, player, playouts, self.batchRng).sum())
+        else:
+            playouts = 1
+            result = playout(position, player, self.rng)
+        while node is not None:
+            node.visits += playouts
+            if node.mover is Player.P1:
+                node.wins += result
+            elif node.mover is Player.P2:
+                node.wins += playouts - result
+            node = node.parent
+
+        for _ in range(0, made):
+            position.unmakeMove()
@@ -1,9 +1,18 @@
 import math
 import threading
 import time
-from copy import deepcopy
 
+from Chains import chainEvaluation, chainMove
 from Gameplay import *
+from MoveOrdering import MoveOrderer
+from Position import *
+from TranspositionTable import TranspositionTable
+
+# Define weights for different components of the evaluation
+BOXES_P1_WEIGHT = 1000
+BOXES_P2_WEIGHT = -1000
+USCORE_WEIGHT = -1
+CONTROL_WEIGHT = 1000
 
 
 def evaluateBoard(board):
@@ -12,20 +21,33 @@ def evaluateBoard(board):
     Current implementation takes into account the [potential] score of both players AND an avoidance of
     completing the third side of a box (using 'uscore').
 
+    Uses the running totals the Board keeps as edges are claimed, so this is O(1).
+
     Parameters
     ----------
-        board: arr arr Box
+        board: Board
             Board to evaluate.
 
     Returns
     -------
         int: Score of the given board.
     """
+    return (board.boxesP1 * BOXES_P1_WEIGHT) + (board.boxesP2 * BOXES_P2_WEIGHT) + (board.threeSided * USCORE_WEIGHT)
+
+
+def evaluateBoardByScan(board):
+    """
+    Reference version of evaluateBoard that recounts everything by scanning all 81 boxes.
+
+    Parameters
+    ----------
+        board: arr arr Box
+            Board to evaluate.
 
-    # Define weights for different components of the evaluation
-    boxesP1_weight = 1000
-    boxesP2_weight = -1000
-    uscore_weight = -1
+    Returns
+    -------
+        int: Score of the given board.
+    """
 
     # Initialize scores
     boxesP1 = 0
@@ -58,31 +80,109 @@ def evaluateBoard(board):
                 uscore += 1
 
     # Calculate score using weighted components
-    score = (boxesP1 * boxesP1_weight) + (boxesP2 * boxesP2_weight) + (uscore * uscore_weight)
+    score = (boxesP1 * BOXES_P1_WEIGHT) + (boxesP2 * BOXES_P2_WEIGHT) + (uscore * USCORE_WEIGHT)
 
     # Return score for board state
     return score
 
-# A Hash table to store the previous evaluated Evaluation Scores of previously visited edges
-transposition_table = {}
 
-def minimax(boardState, nextMoves, depth, player, alpha, beta):
+def evaluatePosition(position, player=None):
+    """
+    Bitboard version of evaluateBoard: same components and weights, computed from a Position. When the player to
+    move is given, a quiet chain endgame also scores the boxes the chain analysis expects each player to win.
+
+    Parameters
+    ----------
+        position: Position
+            Position to evaluate.
+
+        player: Player
+            Player to move, or None to leave out the chain term.
+
+    Returns
+    -------
+        int: Score of the given position.
+    """
+    boxesP1 = position.p1Boxes.bit_count()
+    boxesP2 = position.p2Boxes.bit_count()
+    uscore = position.threeSided
+    score = (boxesP1 * BOXES_P1_WEIGHT) + (boxesP2 * BOXES_P2_WEIGHT) + (uscore * USCORE_WEIGHT)
+    if player is not None:
+        score += chainEvaluation(position, player) * CONTROL_WEIGHT
+    return score
+
+# A Hash table to store the previous evaluated Evaluation Scores of previously visited positions
+transposition_table = TranspositionTable()
+
+# Killer moves, history scores and principal variation shared by the iterations of a search
+move_orderer = MoveOrderer()
+
+# Time (from time.time()) at which the current search must stop, and nodes visited so far
+search_deadline = math.inf
+nodes_searched = 0
+
+# Event (a threading.Event, or anything else with an is_set method) that stops the current search early once set, or
+# None
+search_stop = None
+
+# Quiescence nodes visited in the current search, and how many times the quiescence budget ran out
+quiescence_nodes = 0
+quiescence_budget_hits = 0
+
+# Quiescence nodes visited below the current depth-limit leaf
+quiescence_leaf_nodes = 0
+
+# Whether the current search covers only a share of the root moves (a root-split worker), so its root result is not
+# the position's value and the root is neither looked up in nor stored to the transposition table
+split_root = False
+
+# Transposition table probes, hits and stores in the current search
+tt_probes = 0
+tt_hits = 0
+tt_stores = 0
+
+# Nodes whose moves were searched, and how many of those were cut off (at the first move searched) in the current
+# search, by remaining depth
+expanded_nodes = [0] * (EDGE_COUNT + 1)
+cutoffs = [0] * (EDGE_COUNT + 1)
+first_move_cutoffs = [0] * (EDGE_COUNT + 1)
+
+# Statistics of the last search run by deepen (see searchStatistics), or None
+search_statistics = None
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside minimax when the search deadline passes, to abandon the current iteration.
+    """
+    pass
+
+
+def searchStopped():
+    """
+    Whether the current search must stop: its deadline has passed or its stop event has been set
+    """
+    return time.time() >= search_deadline or (search_stop is not None and search_stop.is_set())
+
+
+def minimax(position, nextMoves, depth, player, alpha, beta, ply=0):
     """
     Use the minimax algorithm with a defined depth limit to determine the bext move to make.
 
     Parameters
     ----------
-        boardState: Board
-            Game board at the top of the tree.
+        position: Position
+            Game position at the top of the tree.
 
-        nextMoves: list Edge
-            List of open edges / available moves.
+        nextMoves: list int
+            List of open edge indices / available moves.
 
         depth: int
-            Distance from maximum depth of tree.
+            Distance from maximum depth of tree, in plies (single edges drawn).
 
         player: Player
-            Player whose turn it is on the current level of the tree.
+            Player whose turn it is on the current level of the tree. A player who completes a box moves again, so
+            the same player can move at several levels in a row.
 
         alpha: int
             Lowest board / move score so far.
@@ -90,33 +190,65 @@ def minimax(boardState, nextMoves, depth, player, alpha, beta):
         beta: int
             Highest board / move score so far.
 
+        ply: int
+            Distance from the root of the tree.
+
     Returns
     -------
-        int: Score of the given board
+        int, int: Score of the given position and the edge index of the best move
     """
+    global nodes_searched, tt_probes, tt_hits, tt_stores, quiescence_leaf_nodes
 
-    # Check if we're at the depth limit
+    # Give up on this iteration if we're out of time
+    nodes_searched += 1
+    if nodes_searched % DEADLINE_CHECK_NODES == 0 and searchStopped():
+        raise SearchTimeout()
+
+    # The board is full
+    if not nextMoves:
+        return evaluatePosition(position, player), None
+
+    # At the depth limit, play out any captures before evaluating
     if depth == 0:
-        return evaluateBoard(boardState.board), None
+        quiescence_leaf_nodes = 0
+        return quiescence(position, player, alpha, beta), None
 
-    # Generate a unique hash key for the current board position
-    board_hash = hash(tuple(tuple(box.owner for box in row) for row in boardState.board))
+    # Zobrist key for the canonical form of the current position and player to move, so all symmetric positions
+    # share an entry. Moves are stored as they'd be played in the canonical form.
+    key, symmetry = position.canonicalKey(player)
 
     # Check if this position is already in the transposition table
-    if board_hash in transposition_table:
-        entry = transposition_table[board_hash]
+    hashMove = None
+    rootShare = split_root and ply == 0
+    tt_probes += 1
+    entry = transposition_table.probe(key)
+    if entry is not None:
+        tt_hits += 1
+        entryDepth, bound, score, hashMove = entry
+        if hashMove is not None:
+            hashMove = EDGE_SYMMETRIES[INVERSE_SYMMETRIES[symmetry]][hashMove]
 
         # Check if we can use the cached result
-        if entry['depth'] >= depth:
-            if entry['flag'] == 'exact':
-                return entry['score'], entry['best_move']
-            elif entry['flag'] == 'lowerbound':
-                alpha = max(alpha, entry['score'])
-            elif entry['flag'] == 'upperbound':
-                beta = min(beta, entry['score'])
+        if entryDepth >= depth and not rootShare:
+            if bound is Bound.EXACT:
+                return score, hashMove
+            elif bound is Bound.LOWER:
+                alpha = max(alpha, score)
+            elif bound is Bound.UPPER:
+                beta = min(beta, score)
 
             if alpha >= beta:
-                return entry['score'], entry['best_move']
+                return score, hashMove
+
+    # Remember the window we were called with to classify the result, and whether any leaf below runs out of
+    # quiescence budget
+    alphaOriginal = alpha
+    betaOriginal = beta
+    budgetHits = quiescence_budget_hits
+
+    # Search the moves most likely to cause a cutoff first
+    nextMoves = move_orderer.orderMoves(position, nextMoves, ply, hashMove)
+    expanded_nodes[depth] += 1
 
     # Check player
     if player is Player.P1:
@@ -125,35 +257,29 @@ def minimax(boardState, nextMoves, depth, player, alpha, beta):
         bestMove = -math.inf, None
 
         # Iterate through possible moves
-        for move in nextMoves:
-
-            # DEBUG
-            # print(f'Check {move.vertex1.x},{move.vertex1.y} {move.vertex2.x},{move.vertex2.y} @ {depth} for {player} -> {evaluateBoard(boardState.board)}')
+        for index, move in enumerate(nextMoves):
 
-            # Copy the board
-            boardCopy = deepcopy(boardState)
-
-            # Simulate next move
-            addNewEdgeFromMove(boardCopy.board, player, move.vertex1, move.vertex2)
-
-            # Evaluate new board
-            evaluation = evaluateBoard(boardCopy.board)
-
-            # Alpha-Beta pruning
-            if evaluation >= beta:
-                return evaluation, move
-            else:
-                alpha = max(alpha, evaluation)
+            # Simulate next move on the shared position (completing a box means moving again)
+            completed = position.makeMove(move, player)
+            nextPlayer = player if completed else Player.P2
 
             # Recurse!
-            childMove = minimax(boardCopy, nextMoves, depth-1, Player.P2, alpha, beta)
+            childMove = minimax(position, position.getOpenEdges(), depth - 1, nextPlayer, alpha, beta, ply + 1)
+
+            # Take the move back
+            position.unmakeMove()
 
             # Is child move better than others?
             if childMove[0] > bestMove[0]:
                 bestMove = childMove[0], move
 
-        # Return best move
-        return bestMove
+            # Alpha-Beta pruning
+            alpha = max(alpha, bestMove[0])
+            if alpha >= beta:
+                move_orderer.recordCutoff(move, ply, depth)
+                cutoffs[depth] += 1
+                first_move_cutoffs[depth] += int(index == 0)
+                break
 
     else:  # Player.P2
 
@@ -161,76 +287,378 @@ def minimax(boardState, nextMoves, depth, player, alpha, beta):
         bestMove = math.inf, None
 
         # Iterate through possible moves
-        for move in nextMoves:
+        for index, move in enumerate(nextMoves):
 
-            # DEBUG
-            # print(f'Check {move.vertex1.x},{move.vertex1.y} {move.vertex2.x},{move.vertex2.y} @ {depth} for {player} -> {evaluateBoard(boardState.board)}')
+            # Simulate next move on the shared position (completing a box means moving again)
+            completed = position.makeMove(move, player)
+            nextPlayer = player if completed else Player.P1
 
-            # Copy the board
-            boardCopy = deepcopy(boardState)
+            # Recurse!
+            childMove = minimax(position, position.getOpenEdges(), depth - 1, nextPlayer, alpha, beta, ply + 1)
 
-            # Simulate next move
-            addNewEdgeFromMove(boardCopy.board, player, move.vertex1, move.vertex2)
+            # Take the move back
+            position.unmakeMove()
 
-            # Evaluate new board
-            evaluation = evaluateBoard(boardCopy.board)
+            # Is child move worse than others?
+            if childMove[0] < bestMove[0]:
+                bestMove = childMove[0], move
 
             # Alpha-Beta pruning
-            if evaluation <= alpha:
-                return evaluation, move
-            else:
-                beta = min(beta, evaluation)
+            beta = min(beta, bestMove[0])
+            if alpha >= beta:
+                move_orderer.recordCutoff(move, ply, depth)
+                cutoffs[depth] += 1
+                first_move_cutoffs[depth] += int(index == 0)
+                break
+
+    # Cache the result in the transposition table, unless a leaf below was evaluated before its captures were
+    # played out (the score is then neither exact nor a bound) or only a share of the root moves was searched
+    best_score, best_move = bestMove
+    if quiescence_budget_hits != budgetHits or rootShare:
+        return best_score, best_move
+    if best_score <= alphaOriginal:
+        bound = Bound.UPPER
+    elif best_score >= betaOriginal:
+        bound = Bound.LOWER
+    else:
+        bound = Bound.EXACT
+    storedMove = EDGE_SYMMETRIES[symmetry][best_move] if best_move is not None else None
+    transposition_table.store(key, depth, bound, best_score, storedMove)
+    tt_stores += 1
 
-            # Recurse!
-            childMove = minimax(boardCopy, nextMoves, depth - 1, Player.P1, alpha, beta)
+    return best_score, best_move
 
-            # Is child move worse than others?
-            if childMove[0] < bestMove[0]:
-                bestMove = childMove[0], move
 
-    # If we reach here, we didn't find a cached result, so compute the result
-    best_score, best_move = None, None  # Initialize with no result
+def captureMoves(position):
+    """
+    Get the moves quiescence expands in a position with boxes to capture. Captures can be taken in any order, so only
+    one is expanded: one that can't matter if there is one, otherwise the first box at the end of a chain, together
+    with the double-dealing move that declines the last two boxes.
+
+    Parameters
+    ----------
+        position: Position
+            Position with at least one three-sided box.
 
-    # Cache the result in the transposition table
-    if best_score is not None:
-        if best_score <= alpha:
-            flag = 'upperbound'
-        elif best_score >= beta:
-            flag = 'lowerbound'
+    Returns
+    -------
+        list int: Edge indices to try
+    """
+    edges = position.edges
+    chainEnd = None
+    for box in range(0, BOX_COUNT):
+        mask = BOX_EDGE_MASKS[box]
+        if (edges & mask).bit_count() != 3:
+            continue
+        edge = (mask & ~edges).bit_length() - 1
+        neighbor = None
+        for other in EDGE_BOXES[edge]:
+            if other != box:
+                neighbor = other
+
+        # Taking this box leaves nothing else capturable
+        if neighbor is None or (edges & BOX_EDGE_MASKS[neighbor]).bit_count() != 2:
+            return [edge]
+
+        if chainEnd is None:
+            farEdge = (BOX_EDGE_MASKS[neighbor] & ~edges & ~(1 << edge)).bit_length() - 1
+            chainEnd = [edge, farEdge]
+    return chainEnd
+
+
+def quiescence(position, player, alpha, beta):
+    """
+    Search past the depth limit until no boxes are left to capture, so positions aren't evaluated in the middle of
+    a capture sequence. A player who completes a box moves again. Every depth-limit leaf has its own node budget
+    (QUIESCENCE_NODE_LIMIT); once it is used up positions below that leaf are evaluated as they stand.
+
+    Parameters
+    ----------
+        position: Position
+            Position to search.
+
+        player: Player
+            Player to move.
+
+        alpha: int
+            Lowest board / move score so far.
+
+        beta: int
+            Highest board / move score so far.
+
+    Returns
+    -------
+        int: Score of the given position
+    """
+    global quiescence_nodes, quiescence_leaf_nodes, quiescence_budget_hits
+
+    quiescence_nodes += 1
+    quiescence_leaf_nodes += 1
+    if quiescence_nodes % DEADLINE_CHECK_NODES == 0 and searchStopped():
+        raise SearchTimeout()
+
+    # Quiet (or out of budget)
+    if position.threeSided == 0:
+        return evaluatePosition(position, player)
+    if quiescence_leaf_nodes >= QUIESCENCE_NODE_LIMIT:
+        quiescence_budget_hits += 1
+        return evaluatePosition(position, player)
+
+    opponent = Player.P2 if player is Player.P1 else Player.P1
+    best = -math.inf if player is Player.P1 else math.inf
+    for move in captureMoves(position):
+        completed = position.makeMove(move, player)
+        score = quiescence(position, player if completed else opponent, alpha, beta)
+        position.unmakeMove()
+
+        if player is Player.P1:
+            best = max(best, score)
+            alpha = max(alpha, best)
         else:
-            flag = 'exact'
+            best = min(best, score)
+            beta = min(beta, best)
+        if alpha >= beta:
+            break
 
-        transposition_table[board_hash] = {
-            'depth': depth,
-            'score': best_score,
-            'flag': flag,
-            'best_move': best_move,
-        }
+    return best
 
-    return best_score, best_move
 
+def principal_variation(position, player, max_length, first_move=None):
+    """
+    Follow the best moves stored in the transposition table from a position.
 
-def iterative_deepening(boardState, nextMoves, max_depth, player, time_limit):
-    best_move = None
-    start_time = time.time()
-    
-    for depth in range(1, max_depth + 1):
-        # Call minimax with alpha-beta pruning and transposition tables
-        score, move = minimax(boardState, nextMoves, depth, player, -math.inf, math.inf)
+    Parameters
+    ----------
+        position: Position
+            Position to start from (left unchanged).
 
-        # Update the best move if a better one is found
-        if move is not None:
-            best_move = move
+        player: Player
+            Player to move in position.
+
+        max_length: int
+            Most moves to follow.
 
-        # Check if time limit is exceeded
-        elapsed_time = time.time() - start_time
-        if elapsed_time >= time_limit:
+        first_move: int
+            Best move at the position itself, for a root that isn't stored in the table (None to look it up).
+
+    Returns
+    -------
+        list int: Edge indices of the principal variation
+    """
+    moves = []
+    while len(moves) < max_length:
+        if first_move is not None and not moves:
+            move = first_move
+        else:
+            key, symmetry = position.canonicalKey(player)
+            entry = transposition_table.probe(key)
+            if entry is None or entry[3] is None:
+                break
+            move = EDGE_SYMMETRIES[INVERSE_SYMMETRIES[symmetry]][entry[3]]
+        if not position.isOpen(move):
             break
+        moves.append(move)
+        if not position.makeMove(move, player):
+            player = Player.P2 if player is Player.P1 else Player.P1
 
-    return best_move
+    # Put the position back
+    for _ in moves:
+        position.unmakeMove()
+    return moves
+
+
+def deepen(position, rootMoves, max_depth, player, deadline, first_depth=1, split=False, stop=None):
+    """
+    Run minimax on a Position at increasing depths until max_depth is reached, the deadline passes or stop is set. An
+    iteration still running then is abandoned.
+
+    Parameters
+    ----------
+        position: Position
+            Position to search (left with moves made on it if an iteration is abandoned).
+
+        rootMoves: list int
+            Edge indices of the root moves to search.
+
+        max_depth: int
+            Deepest iteration to run.
+
+        player: Player
+            Player to move.
 
+        deadline: float
+            Time (from time.time()) at which the search must stop.
 
+        first_depth: int
+            Shallowest iteration to run.
 
+        split: bool
+            Whether rootMoves are only a share of the legal moves (a root-split worker), so the root result must not be
+            stored in the transposition table as the position's.
 
+        stop: threading.Event
+            Event that stops the search once set (anything with an is_set method will do), or None.
 
+    Returns
+    -------
+        list (int, int, int): Depth, score and best move of every completed iteration
+    """
+    global search_deadline, search_stop, nodes_searched, quiescence_nodes, quiescence_budget_hits, search_statistics
+    global tt_probes, tt_hits, tt_stores, expanded_nodes, cutoffs, first_move_cutoffs, split_root
+
+    results = []
+    search_deadline = deadline
+    search_stop = stop
+    split_root = split
+    nodes_searched = quiescence_nodes = quiescence_budget_hits = 0
+    tt_probes = tt_hits = tt_stores = 0
+    depths = max(max_depth, EDGE_COUNT) + 1
+    expanded_nodes, cutoffs, first_move_cutoffs = [0] * depths, [0] * depths, [0] * depths
+    move_orderer.newSearch()
+
+    # Depth and node counts at the start of every iteration, for the statistics
+    start = time.time()
+    iterations = []
+    pv = []
+    try:
+        for depth in range(first_depth, max_depth + 1):
+            iterations.append((depth, nodes_searched, quiescence_nodes, time.time()))
+
+            # Call minimax with alpha-beta pruning and transposition tables
+            score, move = minimax(position, rootMoves, depth, player, -math.inf, math.inf)
+            results.append((depth, score, move))
+
+            # Search this depth's best line first at the next depth
+            pv = principal_variation(position, player, depth, move if split else None)
+            move_orderer.setPrincipalVariation(pv)
+
+            # Check if time limit is exceeded or the search was stopped
+            if searchStopped():
+                break
+    except SearchTimeout:
+        # The unfinished iteration is thrown away; results it stored in the transposition table are still sound
+        pass
+    finally:
+        search_deadline = math.inf
+        search_stop = None
+        split_root = False
+        search_statistics = searchStatistics(iterations, len(results), start, pv)
+
+    return results
+
+
+def searchStatistics(iterations, completed, start, pv):
+    """
+    Gather the counters of the search deepen just ran into a dict that can be logged as JSON.
+
+    Parameters
+    ----------
+        iterations: list (int, int, int, float)
+            Depth, minimax nodes, quiescence nodes and time at the start of every iteration run.
+
+        completed: int
+            How many of the iterations completed (the last one may have been abandoned).
+
+        start: float
+            Time the search started.
+
+        pv: list int
+            Principal variation of the last completed iteration.
+
+    Returns
+    -------
+        dict: Nodes and time per iteration, totals of the search counters, expanded nodes and cutoffs by remaining
+        depth, deepest completed depth and the PV
+    """
+    now = time.time()
+    ends = [(nodes, quiescence, started) for _, nodes, quiescence, started in iterations[1:]]
+    ends.append((nodes_searched, quiescence_nodes, now))
+    perIteration = [{
+        "depth": depth,
+        "nodes": end[0] - nodes,
+        "quiescence_nodes": end[1] - quiescence,
+        "seconds": round(end[2] - started, 4),
+        "completed": index < completed,
+    } for index, ((depth, nodes, quiescence, started), end) in enumerate(zip(iterations, ends))]
+    byDepth = [{
+        "depth": depth,
+        "expanded_nodes": expanded_nodes[depth],
+        "cutoffs": cutoffs[depth],
+        "first_move_cutoffs": first_move_cutoffs[depth],
+    } for depth in range(1, len(expanded_nodes)) if expanded_nodes[depth]]
+
+    return {
+        "depth": iterations[completed - 1][0] if completed else 0,
+        "iterations": perIteration,
+        "seconds": round(now - start, 4),
+        "nodes": nodes_searched,
+        "quiescence_nodes": quiescence_nodes,
+        "quiescence_budget_hits": quiescence_budget_hits,
+        "tt_probes": tt_probes,
+        "tt_hits": tt_hits,
+        "tt_stores": tt_stores,
+        "expanded_nodes": sum(expanded_nodes),
+        "cutoffs": sum(cutoffs),
+        "first_move_cutoffs": sum(first_move_cutoffs),
+        "cutoffs_by_depth": byDepth,
+        "pv": pv,
+    }
+
+
+def iterative_deepening(boardState, nextMoves, max_depth, player, time_limit, stop=None):
+    """
+    Run minimax at increasing depths on a compact copy of the board until the time limit is used up or stop is set.
+    The time limit is a hard deadline: an iteration still running when it passes is abandoned, and the best move of
+    the last completed depth is returned.
+
+    Parameters
+    ----------
+        boardState: Board
+            Current game board.
+
+        nextMoves: list Edge
+            List of open edges / available moves.
+
+        max_depth: int
+            Deepest iteration to run.
+
+        player: Player
+            Player to move.
+
+        time_limit: float
+            Seconds the search may take.
+
+        stop: threading.Event
+            Event that stops the search once set, or None.
+
+    Returns
+    -------
+        Edge: Best move found on boardState
+    """
+    global search_statistics
+
+    start_time = time.time()
+    search_statistics = None
+
+    # Search a compact copy of the board
+    position = boardState.toPosition()
+    rootMoves = [edge.index for edge in nextMoves]
+    if not rootMoves:
+        return None
+
+    # Chain endgames are played straight from the chain analysis
+    shortcut = chainMove(position, player)
+    if shortcut is not None and shortcut in rootMoves:
+        return boardState.getEdge(shortcut)
+
+    # Symmetric positions have symmetric duplicate moves; searching one of each is enough
+    rootMoves = position.uniqueMoves(rootMoves)
+
+    # Any legal move beats running out of time before depth 1 finishes
+    best_move = rootMoves[0]
+    for depth, score, move in deepen(position, rootMoves, max_depth, player, start_time + time_limit, stop=stop):
+        if move is not None:
+            best_move = move
 
+    # Hand back the Board's own Edge object
+    return boardState.getEdge(best_move)
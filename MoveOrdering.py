@@ -0,0 +1,154 @@
+from Position import *
+
+# Move classes, from most to least promising
+MOVE_CAPTURE = 2
+MOVE_SAFE = 1
+MOVE_HANDOUT = 0
+
+# Ordering bands, highest searched first. Moves in the same band are sorted by their history score.
+HASH_MOVE_BAND = 7
+PV_MOVE_BAND = 6
+CAPTURE_BAND = 5
+FIRST_KILLER_BAND = 4
+SECOND_KILLER_BAND = 3
+SAFE_BAND = 2
+HANDOUT_BAND = 1
+
+# History scores stay below this so they never spill into the next band
+HISTORY_LIMIT = 1 << 24
+
+
+def classifyMove(position, move):
+    """
+    Determine whether a move completes a box, is safe (draws no box's third side) or hands boxes to the opponent.
+
+    Parameters
+    ----------
+        position: Position
+            Position the move would be made in.
+
+        move: int
+            Edge index of the move.
+
+    Returns
+    -------
+        int: MOVE_CAPTURE, MOVE_SAFE or MOVE_HANDOUT
+    """
+    moveClass = MOVE_SAFE
+    edges = position.edges
+    for box in EDGE_BOXES[move]:
+        sides = (edges & BOX_EDGE_MASKS[box]).bit_count()
+        if sides == 3:
+            return MOVE_CAPTURE
+        if sides == 2:
+            moveClass = MOVE_HANDOUT
+    return moveClass
+
+
+class MoveOrderer:
+    """
+    Sorts the moves at a search node so the ones most likely to cause a cutoff are searched first: the transposition
+    table move, the principal variation move from the previous iterative deepening depth, box-completing moves, the
+    two killer moves for this ply, safe moves and finally moves that hand over boxes. Killer moves and history scores
+    are learned from cutoffs and kept across the iterations of a search.
+
+    Parameters
+    ------------
+        maxPly: int
+            Deepest ply to keep killer moves for
+    """
+
+    def __init__(self, maxPly=EDGE_COUNT + 1):
+        self.maxPly = maxPly
+        self.killers = [[None, None] for _ in range(maxPly)]
+        self.history = [0] * EDGE_COUNT
+        self.principalVariation = []
+
+    def newSearch(self):
+        """
+        Prepare for searching a new root position: forget killers and the principal variation, and age the history
+        so moves that were good several turns ago count for less.
+        """
+        self.killers = [[None, None] for _ in range(self.maxPly)]
+        self.history = [score >> 1 for score in self.history]
+        self.principalVariation = []
+
+    def setPrincipalVariation(self, moves):
+        """
+        Remember the best line found by the last completed depth.
+
+        Parameters
+        ----------
+            moves: list int
+                Edge indices of the principal variation, starting at the root.
+        """
+        self.principalVariation = list(moves)
+
+    def orderMoves(self, position, moves, ply, hashMove=None):
+        """
+        Sort moves best first.
+
+        Parameters
+        ----------
+            position: Position
+                Position the moves would be made in.
+
+            moves: list int
+                Edge indices of the moves to sort.
+
+            ply: int
+                Distance of this node from the root.
+
+            hashMove: int
+                Best move stored in the transposition table for this position, or None.
+
+        Returns
+        -------
+            list int: The same moves, best first
+        """
+        pvMove = self.principalVariation[ply] if ply < len(self.principalVariation) else None
+        firstKiller, secondKiller = self.killers[ply] if ply < self.maxPly else (None, None)
+        history = self.history
+
+        def priority(move):
+            if move == hashMove:
+                band = HASH_MOVE_BAND
+            elif move == pvMove:
+                band = PV_MOVE_BAND
+            else:
+                moveClass = classifyMove(position, move)
+                if moveClass == MOVE_CAPTURE:
+                    band = CAPTURE_BAND
+                elif move == firstKiller:
+                    band = FIRST_KILLER_BAND
+                elif move == secondKiller:
+                    band = SECOND_KILLER_BAND
+                elif moveClass == MOVE_SAFE:
+                    band = SAFE_BAND
+                else:
+                    band = HANDOUT_BAND
+            return band * HISTORY_LIMIT + history[move]
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def recordCutoff(self, move, ply, depth):
+        """
+        Learn from a move that caused a beta cutoff.
+
+        Parameters
+        ----------
+            move: int
+                Edge index of the move.
+
+            ply: int
+                Distance of the node from the root.
+
+            depth: int
+                Remaining depth the node was searched to.
+        """
+        if ply < self.maxPly:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[move] = min(self.history[move] + depth * depth, HISTORY_LIMIT - 1)
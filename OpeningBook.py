@@ -0,0 +1,217 @@
+import argparse
+import bisect
+import random
+import struct
+import sys
+import time
+from array import array
+from collections import deque
+
+import Minimax
+from Constants import *
+from Position import *
+
+# Book file layout: header (magic, Zobrist seed the keys were made with, number of entries), then the sorted keys as
+# 64-bit ints and one byte per entry for its move, all little-endian whatever machine wrote the book
+BOOK_HEADER = struct.Struct('<4sII')
+BOOK_MAGIC = b'DBOB'
+
+
+class OpeningBook:
+    """
+    Recommended moves for opening positions, generated offline by buildBook. Positions are looked up by the Zobrist
+    key of their canonical form with the player to move, so one entry covers all eight symmetric positions, and moves
+    are stored as they'd be played in the canonical form. Keys are kept sorted, so a lookup is a binary search.
+
+    Parameters
+    ------------
+        path: str
+            Path of the book file
+    """
+
+    def __init__(self, path=OPENING_BOOK_FILE):
+        with open(path, 'rb') as bookFile:
+            data = bookFile.read()
+
+        magic, seed, count = BOOK_HEADER.unpack_from(data)
+        if magic != BOOK_MAGIC or seed != ZOBRIST_SEED:
+            raise ValueError(f'{path} is not an opening book for this Zobrist seed')
+
+        start = BOOK_HEADER.size
+        self.keys = array('Q')
+        self.keys.frombytes(data[start:start + 8 * count])
+        if sys.byteorder == 'big':
+            self.keys.byteswap()
+        self.moves = data[start + 8 * count:start + 9 * count]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, position, player):
+        """
+        Find the book move for a position.
+
+        Parameters
+        ----------
+            position: Position
+                Position to look up.
+
+            player: Player
+                Player to move.
+
+        Returns
+        -------
+            int: Edge index of the book move, or None if the position isn't in the book
+        """
+        key, symmetry = position.canonicalKey(player)
+        index = bisect.bisect_left(self.keys, key)
+        if index == len(self.keys) or self.keys[index] != key:
+            return None
+        move = EDGE_SYMMETRIES[INVERSE_SYMMETRIES[symmetry]][self.moves[index]]
+        return move if position.isOpen(move) else None
+
+    def bookMove(self, boardState, player):
+        """
+        Find the book move for the current game board.
+
+        Parameters
+        ----------
+            boardState: Board
+                Current game board (left unchanged).
+
+            player: Player
+                Player to move.
+
+        Returns
+        -------
+            Edge: The Board's Edge to play, or None if the position is out of book (it isn't in the book, or its book
+            move is already drawn)
+        """
+        move = self.lookup(boardState.toPosition(), player)
+        return None if move is None else boardState.getEdge(move)
+
+    @staticmethod
+    def write(path, entries):
+        """
+        Save a book.
+
+        Parameters
+        ----------
+            path: str
+                Path of the book file.
+
+            entries: dict int -> int
+                Canonical key (with player to move) -> move in the canonical form.
+        """
+        keys = array('Q', sorted(entries))
+        moves = bytes(entries[key] for key in keys)
+        if sys.byteorder == 'big':
+            keys.byteswap()
+        with open(path, 'wb') as bookFile:
+            bookFile.write(BOOK_HEADER.pack(BOOK_MAGIC, ZOBRIST_SEED, len(keys)))
+            bookFile.write(keys.tobytes())
+            bookFile.write(moves)
+
+
+def buildBook(path=OPENING_BOOK_FILE, plies=OPENING_BOOK_PLIES, replies=OPENING_BOOK_REPLIES,
+              searchTime=OPENING_BOOK_SEARCH_TIME, seed=0, branchPlies=OPENING_BOOK_BRANCH_PLIES,
+              replySearchTime=OPENING_BOOK_REPLY_SEARCH_TIME):
+    """
+    Build an opening book by searching opening positions deeply. Starting from the empty board with either player to
+    move, positions where P1 (SmartTeam) moves are searched for searchTime seconds each and the best move is booked and
+    followed. Where P2 moves, their best reply (searched for replySearchTime seconds) is followed, and in the first
+    branchPlies moves a sample of their other moves too, so the book only branches near the root and every line
+    reaches plies moves deep. The book is saved even if building is interrupted.
+
+    Parameters
+    ----------
+        path: str
+            Path of the book file to write.
+
+        plies: int
+            How many moves deep from the empty board to book positions.
+
+        replies: int
+            Number of P2 moves besides the best reply to follow from each position where P2 moves.
+
+        searchTime: float
+            Seconds to search each P1 position.
+
+        seed: int
+            Seed for sampling P2 moves.
+
+        branchPlies: int
+            How many moves deep from the empty board P2 moves are sampled.
+
+        replySearchTime: float
+            Seconds to search each P2 position for the best reply.
+
+    Returns
+    -------
+        int: Number of positions booked
+    """
+    rng = random.Random(seed)
+    entries = {}
+    seen = set()
+    frontier = deque([(Position(), Player.P1, 0), (Position(), Player.P2, 0)])
+
+    try:
+        while frontier:
+            position, player, ply = frontier.popleft()
+            key, symmetry = position.canonicalKey(player)
+            if ply >= plies or key in seen:
+                continue
+            seen.add(key)
+
+            moves = position.uniqueMoves(position.getOpenEdges())
+            start = time.time()
+            results = Minimax.deepen(position.copy(), moves, EDGE_COUNT, player,
+                                     start + (searchTime if player is Player.P1 else replySearchTime))
+            if not results:
+                continue
+            depth, score, move = results[-1]
+            children = [move]
+            if player is Player.P1:
+                entries[key] = EDGE_SYMMETRIES[symmetry][move]
+                print(f'Booked {len(entries)}: ply {ply}, depth {depth}, move {move}')
+            elif ply < branchPlies:
+                others = [other for other in moves if other != move]
+                children += rng.sample(others, min(replies, len(others)))
+
+            # Completing a box means moving again
+            for move in children:
+                child = position.copy()
+                completed = child.claimEdge(move, player)
+                nextPlayer = player if completed else (Player.P2 if player is Player.P1 else Player.P1)
+                frontier.append((child, nextPlayer, ply + 1))
+    except KeyboardInterrupt:
+        print('Interrupted, saving what has been booked')
+
+    OpeningBook.write(path, entries)
+    return len(entries)
+
+
+def main():
+    """
+    Build an opening book from the command line
+    """
+    parser = argparse.ArgumentParser(description="Build an opening book for SmartTeam")
+    parser.add_argument("--path", type=str, default=OPENING_BOOK_FILE, help="Book file to write")
+    parser.add_argument("--plies", type=int, default=OPENING_BOOK_PLIES, help="Moves deep to book")
+    parser.add_argument("--replies", type=int, default=OPENING_BOOK_REPLIES,
+                        help="Opponent moves to follow besides the best reply")
+    parser.add_argument("--search_time", type=float, default=OPENING_BOOK_SEARCH_TIME, help="Seconds per position")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for sampling opponent moves")
+    parser.add_argument("--branch_plies", type=int, default=OPENING_BOOK_BRANCH_PLIES,
+                        help="Moves deep to sample opponent moves")
+    parser.add_argument("--reply_search_time", type=float, default=OPENING_BOOK_REPLY_SEARCH_TIME,
+                        help="Seconds per opponent position")
+    args = parser.parse_args(sys.argv[1:])
+
+    count = buildBook(args.path, args.plies, args.replies, args.search_time, args.seed, args.branch_plies,
+                      args.reply_search_time)
+    print(f'Wrote {count} positions to {args.path}')
+
+
+if __name__ == "__main__":
+    main()
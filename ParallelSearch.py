@@ -0,0 +1,486 @@
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import Minimax
+from Chains import chainMove
+from Constants import *
+from Position import *
+from Telemetry import mergeStatistics
+from TranspositionTable import SharedTranspositionTable, TieredTranspositionTable
+
+
+# The StopFlag of the search this worker process belongs to
+_stopFlag = None
+
+
+class StopFlag:
+    """
+    A flag in shared memory that the agent's process sets to stop its workers' searches early. Same is_set method as
+    threading.Event, so deepen can check either.
+
+    Parameters
+    ------------
+        name: str
+            Name of an existing flag's shared memory to attach to, or None to create a new flag
+    """
+
+    def __init__(self, name=None):
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=1)
+            self.memory.buf[0] = 0
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+
+    def set(self):
+        """
+        Tell the workers to stop
+        """
+        self.memory.buf[0] = 1
+
+    def clear(self):
+        """
+        Let the workers search again
+        """
+        self.memory.buf[0] = 0
+
+    def is_set(self):
+        """
+        Whether the workers have been told to stop
+        """
+        return self.memory.buf[0] != 0
+
+    def close(self, unlink=False):
+        """
+        Detach from the shared memory, and free it if unlink is set (only the process that created it should)
+        """
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+def _workerReady():
+    """
+    Trivial task used to start every worker process up front
+    """
+    return True
+
+
+def _attachStopFlag(name):
+    """
+    Worker initializer: attach to the search's StopFlag
+    """
+    global _stopFlag
+    _stopFlag = StopFlag(name)
+
+
+def _searchRootMoves(edges, p1Boxes, p2Boxes, playerValue, rootMoves, max_depth, deadline):
+    """
+    Worker side of a parallel search: run iterative deepening over a share of the root moves. The transposition table
+    and move ordering tables live on in the worker process between moves; the root itself is never stored in the
+    table, since its result only covers this share of the moves.
+
+    Parameters
+    ----------
+        edges, p1Boxes, p2Boxes: int
+            Masks of the Position to search.
+
+        playerValue: int
+            Value of the Player to move.
+
+        rootMoves: list int
+            Edge indices of this worker's root moves.
+
+        max_depth: int
+            Deepest iteration to run.
+
+        deadline: float
+            Time (from time.time()) at which the search must stop.
+
+    Returns
+    -------
+        list (int, int, int), dict: Depth, score and best move of every completed iteration, and the search statistics
+    """
+    position = Position(edges, p1Boxes, p2Boxes)
+    results = Minimax.deepen(position, rootMoves, max_depth, Player(playerValue), deadline, split=True, stop=_stopFlag)
+    return results, Minimax.search_statistics
+
+
+def _attachSharedTable(stopName, entries, name):
+    """
+    Worker initializer for Lazy SMP: attach to the StopFlag, and search with the shared transposition table instead of
+    the process's own. A persistent table the worker inherited (see TieredTranspositionTable) stays behind the shared
+    one, so the workers read its entries and write their deep results through to it.
+    """
+    _attachStopFlag(stopName)
+    table = SharedTranspositionTable(entries, name)
+    inherited = Minimax.transposition_table
+    if isinstance(inherited, TieredTranspositionTable):
+        table = TieredTranspositionTable(table, inherited.secondary, inherited.minDepth)
+    Minimax.transposition_table = table
+
+
+def _searchSharedRoot(edges, p1Boxes, p2Boxes, playerValue, rootMoves, max_depth, deadline, workerIndex):
+    """
+    Worker side of a Lazy SMP search: run iterative deepening over every root move, sharing the transposition table
+    with the other workers. Workers are staggered so they don't all search the same tree in step: every other worker
+    starts a depth further on, and each starts from a different root move.
+
+    Parameters
+    ----------
+        edges, p1Boxes, p2Boxes: int
+            Masks of the Position to search.
+
+        playerValue: int
+            Value of the Player to move.
+
+        rootMoves: list int
+            Edge indices of the root moves.
+
+        max_depth: int
+            Deepest iteration to run.
+
+        deadline: float
+            Time (from time.time()) at which the search must stop.
+
+        workerIndex: int
+            Which worker this is.
+
+    Returns
+    -------
+        list (int, int, int), dict: Depth, score and best move of every completed iteration, and the search statistics
+    """
+    position = Position(edges, p1Boxes, p2Boxes)
+    shift = workerIndex % len(rootMoves)
+    rootMoves = rootMoves[shift:] + rootMoves[:shift]
+    results = Minimax.deepen(position, rootMoves, max_depth, Player(playerValue), deadline, 1 + workerIndex % 2,
+                             stop=_stopFlag)
+    return results, Minimax.search_statistics
+
+
+class ParallelSearch:
+    """
+    Root-parallel version of iterative_deepening. The root moves are dealt out between worker processes, which each
+    search their share with their own transposition table, and the best move of the deepest iteration every worker
+    completed wins. The worker processes are started once, when the ParallelSearch is made, and reused for every move.
+    Workers are sent the Position masks rather than the Board. A search can be stopped early with a threading.Event,
+    which is passed on to the workers through a StopFlag. The combined search statistics of the last search are kept
+    as statistics.
+
+    Parameters
+    ------------
+        workers: int
+            Number of worker processes (with 1 or fewer, searches run serially in this process)
+    """
+
+    def __init__(self, workers=SEARCH_WORKERS):
+        self.workers = workers
+        self.pool = None
+        self.stopFlag = None
+        self.statistics = None
+        if workers > 1:
+            self.stopFlag = StopFlag()
+            self.pool = self.startPool()
+            wait([self.pool.submit(_workerReady) for _ in range(0, workers)])
+
+    def startPool(self):
+        """
+        Create the pool of worker processes, each attached to the StopFlag
+        """
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_attachStopFlag,
+                                   initargs=(self.stopFlag.name,))
+
+    def shutdown(self):
+        """
+        Stop the worker processes and free the StopFlag
+        """
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+        if self.stopFlag is not None:
+            self.stopFlag.close(unlink=True)
+            self.stopFlag = None
+
+    def search(self, boardState, nextMoves, max_depth, player, time_limit, stop=None):
+        """
+        Find a move the same way as iterative_deepening, spreading the root moves over the worker processes.
+
+        Parameters
+        ----------
+            boardState: Board
+                Current game board.
+
+            nextMoves: list Edge
+                List of open edges / available moves.
+
+            max_depth: int
+                Deepest iteration to run.
+
+            player: Player
+                Player to move.
+
+            time_limit: float
+                Seconds the search may take.
+
+            stop: threading.Event
+                Event that stops the search once set, or None.
+
+        Returns
+        -------
+            Edge: Best move found on boardState
+        """
+        self.statistics = None
+        if self.pool is None:
+            move = Minimax.iterative_deepening(boardState, nextMoves, max_depth, player, time_limit, stop)
+            self.statistics = Minimax.search_statistics
+            return move
+
+        deadline = time.time() + time_limit
+
+        position = boardState.toPosition()
+        rootMoves = [edge.index for edge in nextMoves]
+        if not rootMoves:
+            return None
+
+        # Chain endgames are played straight from the chain analysis
+        shortcut = chainMove(position, player)
+        if shortcut is not None and shortcut in rootMoves:
+            return boardState.getEdge(shortcut)
+
+        # Symmetric positions have symmetric duplicate moves; searching one of each is enough
+        rootMoves = position.uniqueMoves(rootMoves)
+        if len(rootMoves) == 1:
+            return boardState.getEdge(rootMoves[0])
+
+        return boardState.getEdge(self.searchRoot(position, rootMoves, max_depth, player, deadline, stop))
+
+    def awaitWorkers(self, futures, deadline, stop):
+        """
+        Wait for the workers' results until the deadline, or until stop is set. Once stop is set the workers are told
+        to stop too and are waited for, so they are free for the next search when this returns.
+
+        Parameters
+        ----------
+            futures: list Future
+                The workers' searches.
+
+            deadline: float
+                Time (from time.time()) at which the search must stop.
+
+            stop: threading.Event
+                Event that stops the search once set, or None.
+
+        Returns
+        -------
+            set Future: The searches that finished
+        """
+        if stop is None:
+            done, _ = wait(futures, timeout=max(0.0, deadline - time.time()))
+            return done
+
+        while True:
+            done, pending = wait(futures, timeout=min(PARALLEL_STOP_POLL, max(0.0, deadline - time.time())))
+            if not pending or time.time() >= deadline:
+                return done
+            if stop.is_set():
+                self.stopFlag.set()
+                try:
+                    done, _ = wait(futures, timeout=max(0.0, deadline - time.time()))
+                finally:
+                    self.stopFlag.clear()
+                return done
+
+    def searchRoot(self, position, rootMoves, max_depth, player, deadline, stop=None):
+        """
+        Search the root moves on the worker processes.
+
+        Parameters
+        ----------
+            position: Position
+                Position to search.
+
+            rootMoves: list int
+                Edge indices of the root moves (at least two).
+
+            max_depth: int
+                Deepest iteration to run.
+
+            player: Player
+                Player to move.
+
+            deadline: float
+                Time (from time.time()) at which the search must stop.
+
+            stop: threading.Event
+                Event that stops the search once set, or None.
+
+        Returns
+        -------
+            int: Edge index of the best move
+        """
+        # Deal the moves out best first, so every worker gets some of the promising ones
+        rootMoves = Minimax.move_orderer.orderMoves(position, rootMoves, 0)
+        shares = [rootMoves[i::self.workers] for i in range(0, min(self.workers, len(rootMoves)))]
+
+        # Workers stop a little early so their results are back before the deadline
+        workerDeadline = deadline - PARALLEL_RESULT_MARGIN
+        futures = [self.pool.submit(_searchRootMoves, position.edges, position.p1Boxes, position.p2Boxes, player.value,
+                                    share, max_depth, workerDeadline) for share in shares]
+        done = self.awaitWorkers(futures, deadline, stop)
+
+        outputs = [future.result() for future in done if future.exception() is None]
+        move = mergeResults([results for results, _ in outputs], player, rootMoves[0])
+
+        # Report the principal variation of the worker whose move was picked
+        statistics = [statistics for _, statistics in outputs]
+        pvs = [entry['pv'] for entry in statistics if entry is not None and entry['pv'][:1] == [move]]
+        self.statistics = mergeStatistics(statistics, pvs[0] if pvs else None)
+        return move
+
+
+class LazySMPSearch(ParallelSearch):
+    """
+    Lazy SMP version of iterative_deepening: every worker process searches the whole root, at staggered depths, with
+    one transposition table in shared memory, so results one worker stores cut off branches for the others. The
+    deepest completed iteration of any worker gives the move. A persistent table set up before the workers start is
+    kept behind the shared table in every worker.
+
+    Parameters
+    ------------
+        workers: int
+            Number of worker processes (with 1 or fewer, searches run serially in this process)
+        entries: int
+            Number of slots in the shared transposition table (a power of two)
+    """
+
+    def __init__(self, workers=SEARCH_WORKERS, entries=SHARED_TT_ENTRIES):
+        self.table = SharedTranspositionTable(entries) if workers > 1 else None
+        super().__init__(workers)
+
+    def startPool(self):
+        """
+        Create the pool of worker processes, each attached to the StopFlag and the shared transposition table
+        """
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_attachSharedTable,
+                                   initargs=(self.stopFlag.name, self.table.size, self.table.name))
+
+    def shutdown(self):
+        """
+        Stop the worker processes and free the shared transposition table
+        """
+        super().shutdown()
+        if self.table is not None:
+            self.table.close(unlink=True)
+            self.table = None
+
+    def searchRoot(self, position, rootMoves, max_depth, player, deadline, stop=None):
+        """
+        Search the whole root on every worker process (see ParallelSearch.searchRoot).
+        """
+        rootMoves = Minimax.move_orderer.orderMoves(position, rootMoves, 0)
+
+        workerDeadline = deadline - PARALLEL_RESULT_MARGIN
+        futures = [self.pool.submit(_searchSharedRoot, position.edges, position.p1Boxes, position.p2Boxes, player.value,
+                                    rootMoves, max_depth, workerDeadline, index) for index in range(0, self.workers)]
+        done = self.awaitWorkers(futures, deadline, stop)
+
+        # The deepest iteration wins, the lowest numbered worker among equals
+        best = None
+        statistics = []
+        for future in futures:
+            if future not in done or future.exception() is not None:
+                continue
+            results, workerStatistics = future.result()
+            statistics.append(workerStatistics)
+            if not results:
+                continue
+            depth, score, move = results[-1]
+            if move is not None and (best is None or depth > best[0]):
+                best = depth, move, workerStatistics['pv']
+        self.statistics = mergeStatistics(statistics, None if best is None else best[2])
+        return rootMoves[0] if best is None else best[1]
+
+
+def mergeResults(results, player, fallback):
+    """
+    Pick the best root move from the workers' iterative deepening results, comparing scores at the deepest iteration
+    every worker completed.
+
+    Parameters
+    ----------
+        results: list list (int, int, int)
+            Each worker's (depth, score, move) per completed iteration.
+
+        player: Player
+            Player to move at the root.
+
+        fallback: int
+            Move to play if no worker completed an iteration.
+
+    Returns
+    -------
+        int: Edge index of the best move
+    """
+    results = [result for result in results if result]
+    if not results:
+        return fallback
+
+    depth = min(len(result) for result in results)
+    candidates = [result[depth - 1] for result in results if result[depth - 1][2] is not None]
+    if not candidates:
+        return fallback
+
+    if player is Player.P1:
+        best = max(candidates, key=lambda candidate: candidate[1])
+    else:
+        best = min(candidates, key=lambda candidate: candidate[1])
+    return best[2]
+
+
+def benchmark(workers=SEARCH_WORKERS, depth=3, moves=(40, 44, 130, 4, 93, 151, 17), searchClass=ParallelSearch):
+    """
+    Time a fixed-depth search of a fixed opening position serially and in parallel, and print the speedup.
+
+    Parameters
+    ----------
+        workers: int
+            Number of worker processes for the parallel search.
+
+        depth: int
+            Depth to search to.
+
+        moves: tuple int
+            Edge indices drawn (by P1) to make the position.
+
+        searchClass: type
+            ParallelSearch or LazySMPSearch.
+    """
+    from Board import Board
+
+    board = Board()
+    for move in moves:
+        board.makeMove(board.getEdge(move), Player.P1)
+
+    # Start the workers first so they don't inherit the serial search's transposition table
+    Minimax.transposition_table.clear()
+    parallel = searchClass(workers)
+    try:
+        start = time.time()
+        serialMove = Minimax.iterative_deepening(board, board.getOpenEdges(), depth, Player.P1, math.inf)
+        serialTime = time.time() - start
+
+        start = time.time()
+        parallelMove = parallel.search(board, board.getOpenEdges(), depth, Player.P1, 3600)
+        parallelTime = time.time() - start
+    finally:
+        parallel.shutdown()
+
+    print(f'Serial:   {serialTime:.2f}s (move {serialMove.index})')
+    print(f'Parallel: {parallelTime:.2f}s with {workers} workers (move {parallelMove.index})')
+    print(f'Speedup:  {serialTime / parallelTime:.2f}x')
+
+
+if __name__ == "__main__":
+    benchmark(searchClass=LazySMPSearch if PARALLEL_MODE is ParallelMode.LAZY_SMP else ParallelSearch)
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from Constants import *
+
+
+class Ponderer:
+    """
+    Thinks on the opponent's time. While the agent waits for the referee, a background thread searches the current
+    position for whoever moves next, in slices of PONDER_SLICE seconds, with the same search the agent uses for its
+    own moves. Everything it finds stays in the transposition tables, so the search for our next move starts from the
+    lines the opponent's likely replies lead to. The opponent's most likely reply is kept as predictedMove.
+
+    Parameters
+    ------------
+        rootSearch: ParallelSearch
+            Search used for our own moves (serial, root-split or Lazy SMP minimax, or MonteCarloTreeSearch)
+    """
+
+    def __init__(self, rootSearch):
+        self.rootSearch = rootSearch
+        self.thread = None
+        self.stopEvent = threading.Event()
+        self.predictedMove = None
+
+        # Opponent replies seen, and how many of them were the predicted move
+        self.replies = 0
+        self.hits = 0
+
+    def start(self, boardState, player):
+        """
+        Start pondering a position in the background.
+
+        Parameters
+        ----------
+            boardState: Board
+                Current game board (must not change until stop is called).
+
+            player: Player
+                Player to move.
+        """
+        self.stop()
+        self.stopEvent.clear()
+        self.predictedMove = None
+        self.thread = threading.Thread(target=self.__ponder, args=(boardState, player), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Cancel pondering and wait for the background thread to finish, so the search is free for our own move. The
+        search is handed the stop event, so it is cut off at its next deadline check.
+        """
+        if self.thread is None:
+            return
+        self.stopEvent.set()
+        self.thread.join()
+        self.thread = None
+
+    def recordReply(self, edge):
+        """
+        Note the move the opponent actually played (call it for drawn edges only: a pass isn't a reply).
+
+        Parameters
+        ----------
+            edge: Edge
+                The Board's Edge the opponent claimed.
+        """
+        self.replies += 1
+        if edge is not None and edge is self.predictedMove:
+            self.hits += 1
+
+    def __ponder(self, boardState, player):
+        """
+        Search in slices until stopped, or until a slice finishes early (the search has nothing more to add)
+        """
+        while not self.stopEvent.is_set():
+            sliceStart = time.time()
+            move = self.rootSearch.search(boardState, boardState.getOpenEdges(), PONDER_MAX_DEPTH, player,
+                                          PONDER_SLICE, self.stopEvent)
+            if move is None:
+                return
+            if player is Player.P2:
+                self.predictedMove = move
+            if time.time() - sliceStart < PONDER_SLICE:
+                return
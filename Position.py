@@ -0,0 +1,463 @@
+import random
+
+from Constants import *
+
+# Board dimensions (in boxes)
+BOARD_SIZE = 9
+BOX_COUNT = BOARD_SIZE * BOARD_SIZE
+
+# Horizontal edges (x, y) -> (x + 1, y) come first, followed by vertical edges (x, y) -> (x, y + 1)
+HORIZONTAL_EDGES = BOARD_SIZE * (BOARD_SIZE + 1)
+EDGE_COUNT = 2 * HORIZONTAL_EDGES
+
+# Mask with every edge drawn
+ALL_EDGES = (1 << EDGE_COUNT) - 1
+
+
+def horizontalEdge(x, y):
+    """
+    Get the index of the horizontal edge from (x, y) to (x + 1, y).
+    """
+    return y * BOARD_SIZE + x
+
+
+def verticalEdge(x, y):
+    """
+    Get the index of the vertical edge from (x, y) to (x, y + 1).
+    """
+    return HORIZONTAL_EDGES + y * (BOARD_SIZE + 1) + x
+
+
+def boxIndex(x, y):
+    """
+    Get the index of the box whose top left vertex is (x, y).
+    """
+    return y * BOARD_SIZE + x
+
+
+def edgeIndex(x1, y1, x2, y2):
+    """
+    Get the index of the edge between two vertices, in either order.
+
+    Parameters
+    ----------
+        x1, y1: int
+            Coordinates of the first vertex.
+
+        x2, y2: int
+            Coordinates of the second vertex.
+
+    Returns
+    -------
+        int: Index of the edge, or None if the vertices do not make up an edge on the board.
+    """
+
+    # Normalize so that the first vertex is the top / left one
+    if (x2, y2) < (x1, y1):
+        x1, y1, x2, y2 = x2, y2, x1, y1
+
+    # Horizontal edge
+    if y1 == y2 and x2 == x1 + 1 and 0 <= x1 < BOARD_SIZE and 0 <= y1 <= BOARD_SIZE:
+        return horizontalEdge(x1, y1)
+
+    # Vertical edge
+    if x1 == x2 and y2 == y1 + 1 and 0 <= x1 <= BOARD_SIZE and 0 <= y1 < BOARD_SIZE:
+        return verticalEdge(x1, y1)
+
+    return None
+
+
+def _buildTables():
+    """
+    Precompute the edge <-> box incidence tables used by Position.
+    """
+    edgeVertices = [None] * EDGE_COUNT
+    edgeBoxes = [()] * EDGE_COUNT
+    boxEdges = [None] * BOX_COUNT
+    boxEdgeMasks = [0] * BOX_COUNT
+
+    for y in range(0, BOARD_SIZE + 1):
+        for x in range(0, BOARD_SIZE):
+            edgeVertices[horizontalEdge(x, y)] = ((x, y), (x + 1, y))
+    for y in range(0, BOARD_SIZE):
+        for x in range(0, BOARD_SIZE + 1):
+            edgeVertices[verticalEdge(x, y)] = ((x, y), (x, y + 1))
+
+    for y in range(0, BOARD_SIZE):
+        for x in range(0, BOARD_SIZE):
+            box = boxIndex(x, y)
+            # North, east, south, west (same order as Box)
+            edges = (horizontalEdge(x, y), verticalEdge(x + 1, y), horizontalEdge(x, y + 1), verticalEdge(x, y))
+            boxEdges[box] = edges
+            for edge in edges:
+                boxEdgeMasks[box] |= 1 << edge
+                edgeBoxes[edge] = edgeBoxes[edge] + (box,)
+
+    return tuple(edgeVertices), tuple(edgeBoxes), tuple(boxEdges), tuple(boxEdgeMasks)
+
+
+# EDGE_VERTICES[e]: ((x1, y1), (x2, y2)) for edge e
+# EDGE_BOXES[e]: indices of the one or two boxes touching edge e
+# BOX_EDGES[b]: (north, east, south, west) edge indices of box b
+# BOX_EDGE_MASKS[b]: bit mask of the four edges of box b
+EDGE_VERTICES, EDGE_BOXES, BOX_EDGES, BOX_EDGE_MASKS = _buildTables()
+
+
+def _buildVertexIndex():
+    """
+    Precompute the lookup of edges by the coordinates of their vertices.
+    """
+    edgesByVertices = {}
+    for edge in range(0, EDGE_COUNT):
+        vertex1, vertex2 = EDGE_VERTICES[edge]
+        edgesByVertices[(vertex1, vertex2)] = edge
+        edgesByVertices[(vertex2, vertex1)] = edge
+    return edgesByVertices
+
+
+# EDGES_BY_VERTICES[((x1, y1), (x2, y2))]: index of the edge between two vertices, with the vertices in either order
+EDGES_BY_VERTICES = _buildVertexIndex()
+
+# The eight symmetries of the square board, as maps of vertex (x, y) for a board BOARD_SIZE boxes wide. Symmetry 0 is
+# the identity.
+_VERTEX_SYMMETRIES = (
+    lambda x, y: (x, y),
+    lambda x, y: (BOARD_SIZE - y, x),
+    lambda x, y: (BOARD_SIZE - x, BOARD_SIZE - y),
+    lambda x, y: (y, BOARD_SIZE - x),
+    lambda x, y: (BOARD_SIZE - x, y),
+    lambda x, y: (x, BOARD_SIZE - y),
+    lambda x, y: (y, x),
+    lambda x, y: (BOARD_SIZE - y, BOARD_SIZE - x),
+)
+SYMMETRY_COUNT = len(_VERTEX_SYMMETRIES)
+
+# Bits per lookup when transforming a mask
+_CHUNK_BITS = 8
+
+
+def _buildChunkTables(permutation):
+    """
+    Precompute lookup tables that apply a bit permutation to a mask _CHUNK_BITS bits at a time.
+    """
+    tables = []
+    for start in range(0, len(permutation), _CHUNK_BITS):
+        images = [1 << permutation[bit] for bit in range(start, min(start + _CHUNK_BITS, len(permutation)))]
+        table = [0] * (1 << len(images))
+        for value in range(1, len(table)):
+            low = value & -value
+            table[value] = table[value ^ low] | images[low.bit_length() - 1]
+        tables.append(tuple(table))
+    return tuple(tables)
+
+
+def _buildSymmetryTables():
+    """
+    Precompute where each symmetry sends every edge and box, and the chunk tables used to transform masks.
+    """
+    edgeSymmetries = []
+    boxSymmetries = []
+    for transform in _VERTEX_SYMMETRIES:
+        edges = []
+        for (x1, y1), (x2, y2) in EDGE_VERTICES:
+            edges.append(edgeIndex(*transform(x1, y1), *transform(x2, y2)))
+        boxes = []
+        for box in range(0, BOX_COUNT):
+            x, y = box % BOARD_SIZE, box // BOARD_SIZE
+            (x1, y1), (x2, y2) = transform(x, y), transform(x + 1, y + 1)
+            boxes.append(boxIndex(min(x1, x2), min(y1, y2)))
+        edgeSymmetries.append(tuple(edges))
+        boxSymmetries.append(tuple(boxes))
+
+    # Each symmetry's inverse is the symmetry that sends every edge back
+    inverses = []
+    for edges in edgeSymmetries:
+        for inverse, otherEdges in enumerate(edgeSymmetries):
+            if all(otherEdges[edges[edge]] == edge for edge in range(0, EDGE_COUNT)):
+                inverses.append(inverse)
+                break
+
+    edgeChunks = tuple(_buildChunkTables(edges) for edges in edgeSymmetries)
+    boxChunks = tuple(_buildChunkTables(boxes) for boxes in boxSymmetries)
+    return tuple(edgeSymmetries), tuple(boxSymmetries), tuple(inverses), edgeChunks, boxChunks
+
+
+# EDGE_SYMMETRIES[s][e]: image of edge e under symmetry s
+# BOX_SYMMETRIES[s][b]: image of box b under symmetry s
+# INVERSE_SYMMETRIES[s]: the symmetry that undoes symmetry s
+EDGE_SYMMETRIES, BOX_SYMMETRIES, INVERSE_SYMMETRIES, _EDGE_CHUNKS, _BOX_CHUNKS = _buildSymmetryTables()
+
+
+def _transformMask(mask, chunks):
+    """
+    Apply a permutation to the bits of a mask using its chunk tables.
+    """
+    result = 0
+    for table in chunks:
+        result |= table[mask & 0xFF]
+        mask >>= _CHUNK_BITS
+    return result
+
+
+def transformEdges(edges, symmetry):
+    """
+    Get the image of an edge mask under a symmetry
+    """
+    return _transformMask(edges, _EDGE_CHUNKS[symmetry])
+
+
+def transformBoxes(boxes, symmetry):
+    """
+    Get the image of a box mask under a symmetry
+    """
+    return _transformMask(boxes, _BOX_CHUNKS[symmetry])
+
+# 64-bit Zobrist keys for each drawn edge, each box owned by P1 / P2 and P2 being the side to move
+_zobrist = random.Random(ZOBRIST_SEED)
+ZOBRIST_EDGES = tuple(_zobrist.getrandbits(64) for _ in range(EDGE_COUNT))
+ZOBRIST_P1_BOXES = tuple(_zobrist.getrandbits(64) for _ in range(BOX_COUNT))
+ZOBRIST_P2_BOXES = tuple(_zobrist.getrandbits(64) for _ in range(BOX_COUNT))
+ZOBRIST_SIDE = _zobrist.getrandbits(64)
+
+# The same keys seen through each symmetry: SYMMETRIC_ZOBRIST_EDGES[e][s] is the key of edge e's image under symmetry s,
+# so XORing them up gives the Zobrist key of every symmetric image of a position at once
+SYMMETRIC_ZOBRIST_EDGES = tuple(
+    tuple(ZOBRIST_EDGES[EDGE_SYMMETRIES[s][edge]] for s in range(0, SYMMETRY_COUNT)) for edge in range(0, EDGE_COUNT))
+SYMMETRIC_ZOBRIST_P1_BOXES = tuple(
+    tuple(ZOBRIST_P1_BOXES[BOX_SYMMETRIES[s][box]] for s in range(0, SYMMETRY_COUNT)) for box in range(0, BOX_COUNT))
+SYMMETRIC_ZOBRIST_P2_BOXES = tuple(
+    tuple(ZOBRIST_P2_BOXES[BOX_SYMMETRIES[s][box]] for s in range(0, SYMMETRY_COUNT)) for box in range(0, BOX_COUNT))
+
+
+class Position:
+    """
+    A compact representation of the game board for use inside the search. Drawn edges are kept as bits of a single
+    int (bit e set means edge e is drawn) and claimed boxes as one bit mask per Player, so move generation, box
+    completion and evaluation are all bit operations. A Zobrist key of the drawn edges and box owners is updated as
+    moves are made, along with the keys of the position's seven other symmetric images, so the canonical form (the
+    image with the smallest key) is known at every node.
+
+    Parameters
+    ------------
+        edges: int
+            Bit mask of drawn edges
+        p1Boxes: int
+            Bit mask of boxes owned by P1
+        p2Boxes: int
+            Bit mask of boxes owned by P2
+    """
+
+    __slots__ = ('edges', 'p1Boxes', 'p2Boxes', 'key', 'symmetricKeys', 'threeSided', 'undoStack')
+
+    def __init__(self, edges=0, p1Boxes=0, p2Boxes=0):
+        self.edges = edges
+        self.p1Boxes = p1Boxes
+        self.p2Boxes = p2Boxes
+        self.symmetricKeys = self.computeSymmetricKeys()
+        self.key = self.symmetricKeys[0]
+
+        # Number of boxes with exactly three sides drawn, kept up to date by claimEdge
+        self.threeSided = self.countThreeSided()
+
+        # Saved states for unmakeMove
+        self.undoStack = []
+
+    def computeKey(self):
+        """
+        Compute this Position's Zobrist key from scratch. claimEdge keeps self.key up to date incrementally.
+
+        Returns
+        -------
+            int: 64-bit Zobrist key of the drawn edges and box owners
+        """
+        key = 0
+        for edge in range(0, EDGE_COUNT):
+            if (self.edges >> edge) & 1:
+                key ^= ZOBRIST_EDGES[edge]
+        for box in range(0, BOX_COUNT):
+            if (self.p1Boxes >> box) & 1:
+                key ^= ZOBRIST_P1_BOXES[box]
+            elif (self.p2Boxes >> box) & 1:
+                key ^= ZOBRIST_P2_BOXES[box]
+        return key
+
+    def computeSymmetricKeys(self):
+        """
+        Compute the Zobrist keys of all eight symmetric images of this Position from scratch.
+
+        Returns
+        -------
+            list int: Key of the image under each symmetry (the first is computeKey())
+        """
+        keys = [0] * SYMMETRY_COUNT
+        for edge in range(0, EDGE_COUNT):
+            if (self.edges >> edge) & 1:
+                keys = [key ^ image for key, image in zip(keys, SYMMETRIC_ZOBRIST_EDGES[edge])]
+        for box in range(0, BOX_COUNT):
+            if (self.p1Boxes >> box) & 1:
+                keys = [key ^ image for key, image in zip(keys, SYMMETRIC_ZOBRIST_P1_BOXES[box])]
+            elif (self.p2Boxes >> box) & 1:
+                keys = [key ^ image for key, image in zip(keys, SYMMETRIC_ZOBRIST_P2_BOXES[box])]
+        return keys
+
+    def hashKey(self, player):
+        """
+        Get the Zobrist key of this Position with the given player to move
+        """
+        if player is Player.P2:
+            return self.key ^ ZOBRIST_SIDE
+        return self.key
+
+    def canonicalKey(self, player):
+        """
+        Get the Zobrist key of this Position's canonical form (the symmetric image with the smallest key) with the given
+        player to move.
+
+        Returns
+        -------
+            int, int: Canonical key and the symmetry that maps this Position onto its canonical form
+        """
+        key = min(self.symmetricKeys)
+        symmetry = self.symmetricKeys.index(key)
+        if player is Player.P2:
+            key ^= ZOBRIST_SIDE
+        return key, symmetry
+
+    def transform(self, symmetry):
+        """
+        Get the image of this Position under a symmetry
+        """
+        return Position(transformEdges(self.edges, symmetry), transformBoxes(self.p1Boxes, symmetry),
+                        transformBoxes(self.p2Boxes, symmetry))
+
+    def canonical(self):
+        """
+        Get this Position's canonical form.
+
+        Returns
+        -------
+            Position, int: The canonical form and the symmetry that maps this Position onto it
+        """
+        symmetry = self.symmetricKeys.index(min(self.symmetricKeys))
+        return self.transform(symmetry), symmetry
+
+    def symmetries(self):
+        """
+        Get the symmetries that leave this Position unchanged (always including the identity, 0)
+        """
+        return [symmetry for symmetry in range(0, SYMMETRY_COUNT)
+                if transformEdges(self.edges, symmetry) == self.edges
+                and transformBoxes(self.p1Boxes, symmetry) == self.p1Boxes
+                and transformBoxes(self.p2Boxes, symmetry) == self.p2Boxes]
+
+    def uniqueMoves(self, moves):
+        """
+        Drop moves that are symmetric duplicates of another move, keeping one move from each set of equivalent moves.
+
+        Parameters
+        ----------
+            moves: list int
+                Edge indices of the moves to filter.
+
+        Returns
+        -------
+            list int: The moves that remain, in their original order
+        """
+        symmetries = self.symmetries()
+        if len(symmetries) == 1:
+            return list(moves)
+        return [move for move in moves if all(EDGE_SYMMETRIES[symmetry][move] >= move for symmetry in symmetries)]
+
+    def copy(self):
+        """
+        Get an independent copy of this Position
+        """
+        return Position(self.edges, self.p1Boxes, self.p2Boxes)
+
+    def isOpen(self, edge):
+        """
+        Determine whether an edge has not been drawn yet
+        """
+        return not (self.edges >> edge) & 1
+
+    def getOpenEdges(self):
+        """
+        Get every undrawn edge: the list of possible moves.
+
+        Returns
+        -------
+            list int: Indices of open edges, in ascending order
+        """
+        moves = []
+        remaining = ALL_EDGES & ~self.edges
+        while remaining:
+            low = remaining & -remaining
+            moves.append(low.bit_length() - 1)
+            remaining ^= low
+        return moves
+
+    def sidesDrawn(self, box):
+        """
+        Get how many of a box's four edges are drawn
+        """
+        return (self.edges & BOX_EDGE_MASKS[box]).bit_count()
+
+    def countThreeSided(self):
+        """
+        Get the number of boxes with exactly three sides drawn
+        """
+        edges = self.edges
+        return sum(1 for mask in BOX_EDGE_MASKS if (edges & mask).bit_count() == 3)
+
+    def claimEdge(self, edge, player):
+        """
+        Draw an edge for a player, giving them any boxes it completes.
+
+        Parameters
+        ----------
+            edge: int
+                Index of the edge to draw.
+
+            player: Player
+                Player drawing the edge.
+
+        Returns
+        -------
+            int: Number of boxes completed by this move (0, 1 or 2).
+        """
+        self.edges |= 1 << edge
+        self.key ^= ZOBRIST_EDGES[edge]
+        self.symmetricKeys = [key ^ image for key, image in zip(self.symmetricKeys, SYMMETRIC_ZOBRIST_EDGES[edge])]
+
+        completed = 0
+        for box in EDGE_BOXES[edge]:
+            sides = (self.edges & BOX_EDGE_MASKS[box]).bit_count()
+            if sides == 3:
+                self.threeSided += 1
+            elif sides == 4:
+                self.threeSided -= 1
+                completed += 1
+                if player is Player.P1:
+                    self.p1Boxes |= 1 << box
+                    self.key ^= ZOBRIST_P1_BOXES[box]
+                    images = SYMMETRIC_ZOBRIST_P1_BOXES[box]
+                else:
+                    self.p2Boxes |= 1 << box
+                    self.key ^= ZOBRIST_P2_BOXES[box]
+                    images = SYMMETRIC_ZOBRIST_P2_BOXES[box]
+                self.symmetricKeys = [key ^ image for key, image in zip(self.symmetricKeys, images)]
+
+        return completed
+
+    def makeMove(self, edge, player):
+        """
+        Claim an edge in place (see claimEdge), remembering the previous state for unmakeMove.
+        """
+        self.undoStack.append((self.edges, self.p1Boxes, self.p2Boxes, self.key, self.symmetricKeys, self.threeSided))
+        return self.claimEdge(edge, player)
+
+    def unmakeMove(self):
+        """
+        Take back the last move made with makeMove.
+        """
+        self.edges, self.p1Boxes, self.p2Boxes, self.key, self.symmetricKeys, self.threeSided = self.undoStack.pop()
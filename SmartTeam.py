@@ -1,90 +1,165 @@
+import os
 import re
+import time
 
+import Minimax
 from Board import Board
+from Endgame import endgameMove
+from MCTS import MonteCarloTreeSearch
 from Minimax import *
+from OpeningBook import OpeningBook
+from ParallelSearch import LazySMPSearch, ParallelSearch
+from Ponder import Ponderer
+from Telemetry import TelemetryLog
+from TranspositionTable import PersistentTranspositionTable, TieredTranspositionTable
 from Vertex import Vertex
 from Gameplay import *
 
-# Welcome message
-print("------ DOTS & BOXES ------")
-print("| Presented by SmartTeam |")
-print("--------------------------")
+# Worker processes for the parallel search re-import this file, so only run the agent as the main program
+if __name__ == "__main__":
+    # Welcome message
+    print("------ DOTS & BOXES ------")
+    print("| Presented by SmartTeam |")
+    print("--------------------------")
+
+    # Create a board
+    boardState = Board()
+
+    # Carry deep search results over from earlier games
+    persistentTable = None
+    if PERSISTENT_TT_FILE is not None:
+        persistentTable = PersistentTranspositionTable(PERSISTENT_TT_FILE)
+        Minimax.transposition_table = TieredTranspositionTable(Minimax.transposition_table, persistentTable)
+
+    # Book moves for the opening, if a book has been built
+    openingBook = None
+    if OPENING_BOOK_FILE is not None and os.path.exists(OPENING_BOOK_FILE):
+        openingBook = OpeningBook(OPENING_BOOK_FILE)
+
+    # Start the search engine, and any worker processes, once, up front (after the table file is open, so they share it)
+    if ENGINE is Engine.MCTS:
+        rootSearch = MonteCarloTreeSearch()
+    elif PARALLEL_MODE is ParallelMode.LAZY_SMP:
+        rootSearch = LazySMPSearch(SEARCH_WORKERS)
+    else:
+        rootSearch = ParallelSearch(SEARCH_WORKERS)
+
+    # Log how every move was found
+    telemetry = TelemetryLog(TELEMETRY_FILE) if TELEMETRY_FILE is not None else None
+
+    # Think on the opponent's time, for whoever moves next
+    ponderer = Ponderer(rootSearch)
+    ponderPlayer = Player.P2
+
+    # This is "main"
+    while True:
+
+        # Determine if it's our turn
+        if PONDERING:
+            ponderer.start(boardState, ponderPlayer)
+        turnType = awaitTurn()
+        ponderer.stop()
+
+        # If it's the end of the game, end the program
+        if turnType is TurnType.END:
+            print("GAME END")
+            rootSearch.shutdown()
+            if persistentTable is not None:
+                persistentTable.close()
+            break  # Could use exit(0) here with same result
 
-# Create a board
-boardState = Board()
+        # DEBUG
+        print("MY TURN")
 
-# This is "main"
-while True:
+        # Examine board
+        moveFileR = open("move_file", "r")
+        line = moveFileR.readline()
+        moveFileR.close()
 
-    # Determine if it's our turn
-    turnType = awaitTurn()
+        # Interpret coords
+        coords = re.findall("[0-9],[0-9]", line)
 
-    # If it's the end of the game, end the program
-    if turnType is TurnType.END:
-        print("GAME END")
-        break  # Could use exit(0) here with same result
+        # If opponent has moved
+        if len(coords) != 0:
+            vertex1 = Vertex(int(coords[0][0]), int(coords[0][2]))
+            vertex2 = Vertex(int(coords[1][0]), int(coords[1][2]))
 
-    # DEBUG
-    print("MY TURN")
+            # DEBUG
+            print(f'Op move {vertex1.x},{vertex1.y} {vertex2.x},{vertex2.y}')
 
-    # Examine board
-    moveFileR = open("move_file", "r")
-    line = moveFileR.readline()
-    moveFileR.close()
+            # Add opponent move
+            opponentEdge, _ = boardState.findEdge(vertex1, vertex2)
+            edgeStatus = addNewEdgeFromMove(boardState, Player.P2, vertex1, vertex2)
+            if not edgeStatus[0]:
+                oopsie(edgeStatus)
 
-    # Interpret coords
-    coords = re.findall("[0-9],[0-9]", line)
+            # Only a drawn edge counts as a reply the ponderer could have predicted, not a pass
+            if edgeStatus[1] is EdgeError.EDGE_VALID:
+                ponderer.recordReply(opponentEdge)
 
-    # If opponent has moved
-    if len(coords) != 0:
-        vertex1 = Vertex(int(coords[0][0]), int(coords[0][2]))
-        vertex2 = Vertex(int(coords[1][0]), int(coords[1][2]))
+        # Do we pass or play?
+        if turnType is TurnType.GO:
 
-        # DEBUG
-        print(f'Op move {vertex1.x},{vertex1.y} {vertex2.x},{vertex2.y}')
+            # Make our move
+            # ourMove = minimax(boardState, boardState.getOpenEdges(), TREE_DEPTH, Player.P1, -math.inf, math.inf)
 
-        # Add opponent move
-        edgeStatus = addNewEdgeFromMove(boardState.board, Player.P2, vertex1, vertex2)
-        if not edgeStatus[0]:
-            oopsie(edgeStatus)
+            # Play from the book in the opening
+            searchStart = time.time()
+            ourMove = None
+            source = "book"
+            statistics = None
+            if openingBook is not None:
+                ourMove = openingBook.bookMove(boardState, Player.P1)
 
-    # Do we pass or play?
-    if turnType is TurnType.GO:
+            # Solve the endgame exactly once it is small enough, otherwise (or if that runs out of time) search
+            if ourMove is None:
+                source = "endgame"
+                ourMove = endgameMove(boardState, Player.P1, ENDGAME_TIME_LIMIT)
+            if ourMove is None:
+                source = "search"
+                timeLeft = SEARCH_TIME_LIMIT - (time.time() - searchStart)
+                ourMove = rootSearch.search(boardState, boardState.getOpenEdges(), 10, Player.P1, timeLeft)
+                statistics = rootSearch.statistics
 
-        # Make our move
-        # ourMove = minimax(boardState, boardState.getOpenEdges(), TREE_DEPTH, Player.P1, -math.inf, math.inf)
+            if telemetry is not None:
+                telemetry.record(ourMove.index, source, SEARCH_TIME_LIMIT, time.time() - searchStart, statistics)
 
-        ourMove = iterative_deepening(boardState, boardState.getOpenEdges(), 10, Player.P1, 4); 
 
+            # Add it to the board
+            # addNewEdgeFromMove(boardState.board, Player.P1, ourMove[1].vertex1, ourMove[1].vertex2)
 
-        # Add it to the board
-        # addNewEdgeFromMove(boardState.board, Player.P1, ourMove[1].vertex1, ourMove[1].vertex2)
-        
-        #ID
-        addNewEdgeFromMove(boardState.board, Player.P1, ourMove.vertex1, ourMove.vertex2)
+            #ID
+            boxesBefore = boardState.boxesP1
+            addNewEdgeFromMove(boardState, Player.P1, ourMove.vertex1, ourMove.vertex2)
 
+            # Completing a box means we move again
+            ponderPlayer = Player.P1 if boardState.boxesP1 > boxesBefore else Player.P2
 
-        # DEBUG
-        # print(f'My move {ourMove[1].vertex1.x},{ourMove[1].vertex1.y} {ourMove[1].vertex2.x},{ourMove[1].vertex2.y}')
 
-        # Pass off to opponent
-        moveFileW = open("move_file", "w")
-        # line = f'{TEAM_NAME} {ourMove[1].vertex1.x},{ourMove[1].vertex1.y} {ourMove[1].vertex2.x},{ourMove[1].vertex2.y}'
-        
-        #ID
-        line = f'{TEAM_NAME} {ourMove.vertex1.x},{ourMove.vertex1.y} {ourMove.vertex2.x},{ourMove.vertex2.y}'
-        
-        moveFileW.write(line)
-        moveFileW.close()
+            # DEBUG
+            # print(f'My move {ourMove[1].vertex1.x},{ourMove[1].vertex1.y} {ourMove[1].vertex2.x},{ourMove[1].vertex2.y}')
 
-    # If we're passing (opponent has scored)
-    elif turnType is TurnType.PASS:
+            # Pass off to opponent
+            moveFileW = open("move_file", "w")
+            # line = f'{TEAM_NAME} {ourMove[1].vertex1.x},{ourMove[1].vertex1.y} {ourMove[1].vertex2.x},{ourMove[1].vertex2.y}'
 
-        # DEBUG
-        print(f'My move PASS')
+            #ID
+            line = f'{TEAM_NAME} {ourMove.vertex1.x},{ourMove.vertex1.y} {ourMove.vertex2.x},{ourMove.vertex2.y}'
+
+            moveFileW.write(line)
+            moveFileW.close()
+
+        # If we're passing (opponent has scored)
+        elif turnType is TurnType.PASS:
+
+            # DEBUG
+            print(f'My move PASS')
+
+            # The opponent scored, so they move again
+            ponderPlayer = Player.P2
 
-        # Pass off to opponent
-        moveFileW = open("move_file", "w")
-        line = f'{TEAM_NAME} 0,0 0,0'
-        moveFileW.write(line)
-        moveFileW.close()
+            # Pass off to opponent
+            moveFileW = open("move_file", "w")
+            line = f'{TEAM_NAME} 0,0 0,0'
+            moveFileW.write(line)
+            moveFileW.close()
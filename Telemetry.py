@@ -0,0 +1,144 @@
+import json
+import time
+
+from Constants import *
+
+# Search counters that are added up when statistics are merged
+_COUNTERS = ('nodes', 'quiescence_nodes', 'quiescence_budget_hits', 'tt_probes', 'tt_hits', 'tt_stores',
+             'expanded_nodes', 'cutoffs', 'first_move_cutoffs')
+
+# Counters kept by remaining depth
+_DEPTH_COUNTERS = ('expanded_nodes', 'cutoffs', 'first_move_cutoffs')
+
+
+def _rate(count, total):
+    """
+    count / total, or None if there was nothing to count
+    """
+    return round(count / total, 4) if total else None
+
+
+def mergeStatistics(statistics, pv=None):
+    """
+    Combine the statistics of searches run side by side, such as the workers of a parallel search: counters, the nodes
+    of iterations at the same depth and the cutoffs at the same remaining depth are added up, and the time and depth
+    are those of the longest and deepest.
+
+    Parameters
+    ----------
+        statistics: list dict
+            Statistics of each search (see Minimax.searchStatistics); None entries are skipped.
+
+        pv: list int
+            Principal variation to report, or None to take the one from the deepest search.
+
+    Returns
+    -------
+        dict: Combined statistics, or None if there were none
+    """
+    statistics = [entry for entry in statistics if entry is not None]
+    if not statistics:
+        return None
+
+    deepest = max(statistics, key=lambda entry: entry['depth'])
+    merged = {counter: sum(entry[counter] for entry in statistics) for counter in _COUNTERS}
+    merged['depth'] = deepest['depth']
+    merged['seconds'] = max(entry['seconds'] for entry in statistics)
+    merged['pv'] = deepest['pv'] if pv is None else pv
+    merged['searches'] = len(statistics)
+
+    iterations = {}
+    for entry in statistics:
+        for iteration in entry['iterations']:
+            total = iterations.get(iteration['depth'])
+            if total is None:
+                iterations[iteration['depth']] = dict(iteration)
+                continue
+            total['nodes'] += iteration['nodes']
+            total['quiescence_nodes'] += iteration['quiescence_nodes']
+            total['seconds'] = max(total['seconds'], iteration['seconds'])
+            total['completed'] = total['completed'] or iteration['completed']
+    merged['iterations'] = [iterations[depth] for depth in sorted(iterations)]
+
+    byDepth = {}
+    for entry in statistics:
+        for counts in entry['cutoffs_by_depth']:
+            total = byDepth.setdefault(counts['depth'], dict.fromkeys(_DEPTH_COUNTERS, 0))
+            for counter in _DEPTH_COUNTERS:
+                total[counter] += counts[counter]
+    merged['cutoffs_by_depth'] = [dict(depth=depth, **byDepth[depth]) for depth in sorted(byDepth)]
+    return merged
+
+
+class TelemetryLog:
+    """
+    Per-move record of what the agent did, one JSON object per line. Every record has the move, where it came from
+    (book, endgame solver or search), and the time used against the budget; moves that were searched also carry the
+    search statistics with the rates worked out: nodes per second, transposition table hit rate, the share of
+    expanded nodes that were cut off and the share of cutoffs made by the first move searched, overall and at every
+    remaining depth.
+
+    Parameters
+    ------------
+        path: str
+            Path of the JSON Lines file to append to
+    """
+
+    def __init__(self, path=TELEMETRY_FILE):
+        self.path = path
+        self.moves = 0
+
+    def record(self, move, source, budget, elapsed, statistics=None):
+        """
+        Append the record for one move.
+
+        Parameters
+        ----------
+            move: int
+                Edge index of the move played.
+
+            source: str
+                Where the move came from ("book", "endgame" or "search").
+
+            budget: float
+                Seconds the move was allowed.
+
+            elapsed: float
+                Seconds the move took.
+
+            statistics: dict
+                Search statistics (see Minimax.searchStatistics), or None if nothing was searched.
+
+        Returns
+        -------
+            dict: The record written
+        """
+        self.moves += 1
+        entry = {
+            "time": round(time.time(), 3),
+            "move_number": self.moves,
+            "move": move,
+            "source": source,
+            "budget": round(budget, 3),
+            "elapsed": round(elapsed, 4),
+            "budget_used": _rate(elapsed, budget),
+        }
+
+        if statistics is not None:
+            entry.update(statistics)
+
+        # Rates for minimax searches (Monte Carlo searches report playouts instead)
+        if statistics is not None and 'nodes' in statistics:
+            nodes = statistics['nodes'] + statistics['quiescence_nodes']
+            entry['nodes_per_second'] = round(nodes / statistics['seconds']) if statistics['seconds'] else None
+            entry['tt_hit_rate'] = _rate(statistics['tt_hits'], statistics['tt_probes'])
+            entry['cutoff_rate'] = _rate(statistics['cutoffs'], statistics['expanded_nodes'])
+            entry['first_move_cutoff_rate'] = _rate(statistics['first_move_cutoffs'], statistics['cutoffs'])
+            entry['cutoffs_by_depth'] = [dict(counts, cutoff_rate=_rate(counts['cutoffs'], counts['expanded_nodes']),
+                                              first_move_cutoff_rate=_rate(counts['first_move_cutoffs'],
+                                                                           counts['cutoffs']))
+                                         for counts in statistics['cutoffs_by_depth']]
+
+        with open(self.path, 'a') as logFile:
+            logFile.write(json.dumps(entry) + '\n')
+        return entry
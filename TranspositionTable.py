@@ -0,0 +1,351 @@
+import mmap
+import os
+import struct
+from multiprocessing import shared_memory
+
+from Constants import *
+
+
+class TranspositionTable:
+    """
+    A table of previously searched positions, keyed on their Zobrist key (see Position.canonicalKey). Each entry keeps the
+    depth it was searched to, whether its score is exact or a lower / upper bound, the score and the best move found.
+
+    Parameters
+    ------------
+        maxEntries: int
+            Number of entries to hold before the table is cleared and starts over
+    """
+
+    def __init__(self, maxEntries=TT_MAX_ENTRIES):
+        self.maxEntries = maxEntries
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        """
+        Remove every entry from the table
+        """
+        self.entries.clear()
+
+    def probe(self, key):
+        """
+        Look up a position.
+
+        Parameters
+        ----------
+            key: int
+                Zobrist key of the position.
+
+        Returns
+        -------
+            (int, Bound, int, int): Depth, bound, score and best move of the entry, or None if there is no entry.
+        """
+        return self.entries.get(key)
+
+    def store(self, key, depth, bound, score, move):
+        """
+        Save the result of searching a position. An existing entry is only replaced by one searched at least as deep.
+
+        Parameters
+        ----------
+            key: int
+                Zobrist key of the position.
+
+            depth: int
+                Depth the position was searched to.
+
+            bound: Bound
+                Whether score is exact or a lower / upper bound.
+
+            score: int
+                Score of the position.
+
+            move: int
+                Edge index of the best move, or None.
+        """
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > depth:
+            return
+
+        # Start over rather than grow without limit
+        if entry is None and len(self.entries) >= self.maxEntries:
+            self.entries.clear()
+
+        self.entries[key] = (depth, bound, score, move)
+
+
+# Bytes per entry of a packed table: key (8), score (4), move (2), depth (1) and bound (1)
+PACKED_ENTRY_BYTES = 16
+
+# Bounds by value, for turning stored flags back into Bound
+_BOUNDS = tuple(Bound)
+
+
+class PackedTranspositionTable:
+    """
+    A fixed-size transposition table in packed arrays of keys, scores, moves, depths and bounds laid over a buffer, so
+    it can live in shared memory or a memory-mapped file. Positions hash to a bucket of one or more slots by the low
+    bits of their key. There are no locks: each stored key is XORed with the rest of its entry, so an entry torn by two
+    processes writing at once no longer matches its key and reads as a miss.
+
+    Same interface as TranspositionTable. An existing entry for the same position is only replaced by one searched at
+    least as deep; otherwise a new entry goes in an empty slot of its bucket, or replaces the shallowest entry there.
+
+    Parameters
+    ------------
+        buffer: memoryview
+            Buffer of entries * PACKED_ENTRY_BYTES bytes to keep the table in
+        entries: int
+            Number of slots (a power of two)
+        ways: int
+            Slots per bucket (a power of two)
+    """
+
+    def __init__(self, buffer, entries, ways=1):
+        self.size = entries
+        self.ways = ways
+        self.mask = (entries - 1) & ~(ways - 1)
+        self.buffer = buffer
+
+        # Lay the arrays out one after another, widest first so each stays aligned
+        self.keys = buffer[0:8 * entries].cast('Q')
+        self.scores = buffer[8 * entries:12 * entries].cast('i')
+        self.moves = buffer[12 * entries:14 * entries].cast('H')
+        self.depths = buffer[14 * entries:15 * entries].cast('B')
+        self.bounds = buffer[15 * entries:16 * entries].cast('B')
+
+    def __len__(self):
+        return sum(1 for key in self.keys if key)
+
+    def releaseArrays(self):
+        """
+        Let go of the views on the buffer, so it can be closed
+        """
+        for array in (self.keys, self.scores, self.moves, self.depths, self.bounds, self.buffer):
+            array.release()
+
+    def clear(self):
+        """
+        Remove every entry from the table
+        """
+        self.buffer[:] = bytes(self.size * PACKED_ENTRY_BYTES)
+
+    @staticmethod
+    def __check(score, moveCode, depth, bound):
+        """
+        Pack the non-key fields of an entry into the 64-bit value its key is XORed with
+        """
+        return (score & 0xFFFFFFFF) | (moveCode << 32) | (depth << 48) | (bound << 56)
+
+    def __find(self, key):
+        """
+        Get the slot holding a position, or None
+        """
+        bucket = key & self.mask
+        for slot in range(bucket, bucket + self.ways):
+            storedKey = self.keys[slot]
+            if storedKey and storedKey ^ self.__check(self.scores[slot], self.moves[slot], self.depths[slot],
+                                                      self.bounds[slot]) == key:
+                return slot
+        return None
+
+    def probe(self, key):
+        """
+        Look up a position.
+
+        Parameters
+        ----------
+            key: int
+                Zobrist key of the position.
+
+        Returns
+        -------
+            (int, Bound, int, int): Depth, bound, score and best move of the entry, or None if there is no entry.
+        """
+        slot = self.__find(key)
+        if slot is None:
+            return None
+        moveCode = self.moves[slot]
+        return self.depths[slot], _BOUNDS[self.bounds[slot]], self.scores[slot], (moveCode - 1 if moveCode else None)
+
+    def store(self, key, depth, bound, score, move):
+        """
+        Save the result of searching a position.
+
+        Parameters
+        ----------
+            key: int
+                Zobrist key of the position.
+
+            depth: int
+                Depth the position was searched to.
+
+            bound: Bound
+                Whether score is exact or a lower / upper bound.
+
+            score: int
+                Score of the position.
+
+            move: int
+                Edge index of the best move, or None.
+        """
+        slot = self.__find(key)
+        if slot is not None:
+            if self.depths[slot] > depth:
+                return
+        else:
+            # An empty slot, or else the shallowest entry in the bucket
+            bucket = key & self.mask
+            slot = min(range(bucket, bucket + self.ways),
+                       key=lambda other: self.depths[other] if self.keys[other] else -1)
+
+        moveCode = 0 if move is None else move + 1
+        self.scores[slot] = score
+        self.moves[slot] = moveCode
+        self.depths[slot] = depth
+        self.bounds[slot] = bound.value
+        self.keys[slot] = key ^ self.__check(score, moveCode, depth, bound.value)
+
+
+class SharedTranspositionTable(PackedTranspositionTable):
+    """
+    A PackedTranspositionTable in shared memory, so several processes can search with the same table.
+
+    Parameters
+    ------------
+        entries: int
+            Number of slots (a power of two)
+        name: str
+            Name of an existing table's shared memory to attach to, or None to create a new table
+    """
+
+    def __init__(self, entries=SHARED_TT_ENTRIES, name=None):
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=entries * PACKED_ENTRY_BYTES)
+            self.memory.buf[:] = bytes(entries * PACKED_ENTRY_BYTES)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        super().__init__(self.memory.buf[:entries * PACKED_ENTRY_BYTES], entries)
+
+    def close(self, unlink=False):
+        """
+        Detach from the shared memory, and free it if unlink is set (only the process that created it should)
+        """
+        self.releaseArrays()
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+# Header of a persistent table file: magic, file format version, evaluation version the scores were made with, Zobrist
+# seed the keys were made with, and number of slots
+PERSISTENT_HEADER = struct.Struct('<4sIIIQ')
+PERSISTENT_MAGIC = b'DBTT'
+PERSISTENT_FORMAT_VERSION = 1
+
+
+class PersistentTranspositionTable(PackedTranspositionTable):
+    """
+    A PackedTranspositionTable in a memory-mapped file, so search results carry over from game to game. Opening the
+    table only maps the file; pages are read as they're probed. The file never grows: once a bucket is full, new
+    entries replace its shallowest one. A file made for a different size, file format, evaluation version
+    (EVALUATION_VERSION) or Zobrist seed is started over.
+
+    Parameters
+    ------------
+        path: str
+            Path of the table file (created if missing)
+        entries: int
+            Number of slots (a power of two)
+        ways: int
+            Slots per bucket (a power of two)
+    """
+
+    def __init__(self, path, entries=PERSISTENT_TT_ENTRIES, ways=PERSISTENT_TT_WAYS):
+        self.path = path
+        size = PERSISTENT_HEADER.size + entries * PACKED_ENTRY_BYTES
+        header = PERSISTENT_HEADER.pack(PERSISTENT_MAGIC, PERSISTENT_FORMAT_VERSION, EVALUATION_VERSION, ZOBRIST_SEED,
+                                        entries)
+
+        if not os.path.exists(path):
+            open(path, 'wb').close()
+        self.file = open(path, 'r+b')
+        if self.file.read(PERSISTENT_HEADER.size) != header or os.path.getsize(path) != size:
+            self.file.seek(0)
+            self.file.truncate(0)
+            self.file.write(header)
+            self.file.truncate(size)
+            self.file.flush()
+
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.view = memoryview(self.map)
+        super().__init__(self.view[PERSISTENT_HEADER.size:], entries, ways)
+
+    def flush(self):
+        """
+        Write changed entries out to the file
+        """
+        self.map.flush()
+
+    def close(self):
+        """
+        Flush and close the table file
+        """
+        self.releaseArrays()
+        self.view.release()
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+class TieredTranspositionTable:
+    """
+    A fast in-memory table in front of a bigger, slower one (such as a PersistentTranspositionTable). Lookups try the
+    in-memory table first; results searched at least minDepth deep are also saved to the second table.
+
+    Same interface as TranspositionTable.
+
+    Parameters
+    ------------
+        primary: TranspositionTable
+            In-memory table
+        secondary: PackedTranspositionTable
+            Table behind it
+        minDepth: int
+            Shallowest result worth saving to the second table
+    """
+
+    def __init__(self, primary, secondary, minDepth=PERSISTENT_TT_MIN_DEPTH):
+        self.primary = primary
+        self.secondary = secondary
+        self.minDepth = minDepth
+
+    def __len__(self):
+        return len(self.primary)
+
+    def clear(self):
+        """
+        Remove every entry from the in-memory table (the second table keeps its entries)
+        """
+        self.primary.clear()
+
+    def probe(self, key):
+        """
+        Look up a position (see TranspositionTable.probe)
+        """
+        entry = self.primary.probe(key)
+        if entry is None:
+            entry = self.secondary.probe(key)
+        return entry
+
+    def store(self, key, depth, bound, score, move):
+        """
+        Save the result of searching a position (see TranspositionTable.store)
+        """
+        self.primary.store(key, depth, bound, score, move)
+        if depth >= self.minDepth:
+            self.secondary.store(key, depth, bound, score, move)
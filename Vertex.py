@@ -1,6 +1,8 @@
 class Vertex:
     """
-    An object representing the endpoint of an Edge or corner of a Box
+    An object representing the endpoint of an Edge or corner of a Box. The 100 Vertices on the board are interned:
+    Vertex(x, y) always returns the same object for the same lattice point, so board Vertices can be compared with
+    `is`. Coordinates off the board (such as a bad move read from the referee) get a Vertex of their own.
 
     Parameters
     ------------
@@ -10,9 +12,15 @@ class Vertex:
             The y coordinate of this Vertex (from 0 to 9)
     """
 
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
+    __slots__ = ('x', 'y')
+
+    def __new__(cls, x, y):
+        if VERTICES is not None and 0 <= x <= 9 and 0 <= y <= 9:
+            return VERTICES[y][x]
+        vertex = super().__new__(cls)
+        vertex.x = x
+        vertex.y = y
+        return vertex
 
     def equals(self, other):
         """
@@ -27,6 +35,13 @@ class Vertex:
         ------------
             boolean: Whether these Vertices are equal
         """
+        if self is other:
+            return True
         xEq = self.x == other.x
         yEq = self.y == other.y
-        return xEq and yEq
\ No newline at end of file
+        return xEq and yEq
+
+
+# Table of the interned board Vertices, indexed [y][x]
+VERTICES = None
+VERTICES = tuple(tuple(Vertex(x, y) for x in range(0, 10)) for y in range(0, 10))
@@ -1,13 +1,12 @@
 
+import random
+
 import numpy as np
-import pygame
 import core_gameplay as gp
-import display as disp
 from dotsandboxes import generateEdges
-from external_players import external_player
 
-# Each AI function will have its own file to allow for more modular creation
-import human
+# pygame and display (which opens the window as it is imported) are only imported when a game is shown, so headless
+# games run without them
 
 
 def nums_output(nums, p1_name, p2_name):
@@ -28,7 +27,18 @@ def nums_output(nums, p1_name, p2_name):
 
 
 class Game:
-    def __init__(self, f_p1, f_p2, p1_name=None, p2_name=None, rand_start=False):
+    """
+    A game between two players. Normally the game is shown with pygame and players are external programs reached
+    through external_players (or people, through human). A headless game instead takes Python callables and plays
+    them against each other in process with play(), with no window and no files.
+
+    Headless players are called as player(board, name, opponent_name) with the referee's edge dict (edges of f_p1 are
+    marked 1, those of f_p2 2) and return their move as ((r1, c1), (r2, c2)), or a (BAD_MOVE_*, message) pair to end
+    the game. Completing a square means moving again; the opponent's pass turn is skipped. f_p1 moves first, unless
+    rand_start is set, in which case either player may.
+    """
+
+    def __init__(self, f_p1, f_p2, p1_name=None, p2_name=None, rand_start=False, headless=False):
         self.names = [gp.PLAYER0_MARKER if p1_name is None else p1_name,
                       gp.PLAYER1_MARKER if p2_name is None else p2_name]
         self.f_p1 = f_p1
@@ -41,14 +51,24 @@ class Game:
         self.pass_or_go = False
     
         # Allows to easily change players and markers
-        self.current_player = 0
+        self.current_player = random.randint(0, 1) if rand_start else 0
         self.markers = [gp.PLAYER0_MARKER, gp.PLAYER1_MARKER]
         self.winner = gp.NO_MARKER
+        self.headless = headless
+        self.end_message = None
 
         #  Pygame initialization
-        pygame.init()
+        if not headless:
+            import pygame
+            pygame.init()
 
     def run(self):
+        if self.headless:
+            return self.play()
+
+        import pygame
+        import display as disp
+
         #  Drawing function
         disp.draw_game_board(self.board, self.completed_squares)
 
@@ -141,6 +161,67 @@ class Game:
             #  Drawing function
             disp.draw_game_board(self.board, self.completed_squares)
 
+    def play(self):
+        """
+        Play a headless game to the end: players move in turn, applying their moves with getPoints, until every edge
+        is marked or a player makes a bad move (which loses).
+
+        Returns
+        -------
+            int: Marker of the winner (gp.PLAYER0_MARKER for f_p1), or gp.DRAW
+        """
+        players = [self.f_p1, self.f_p2]
+        while self.moves < len(self.board):
+            selected_move = players[self.current_player](self.board, self.names[self.current_player],
+                                                         self.names[(self.current_player + 1) % 2])
+            try:
+                (r1, c1), (r2, c2) = selected_move
+                move = ((int(r1), int(c1)), (int(r2), int(c2)))
+            except (TypeError, ValueError):
+                # The player gave up the game, or sent something that is not a move
+                try:
+                    sig, msg = selected_move
+                except (TypeError, ValueError):
+                    sig = msg = None
+                if sig == gp.BAD_MOVE_I_WIN:
+                    self.winner = gp.MARKERS[self.current_player]
+                elif sig == gp.BAD_MOVE_DRAW:
+                    self.winner = gp.DRAW
+                elif sig == gp.BAD_MOVE_I_LOST:
+                    self.winner = gp.MARKERS[(self.current_player + 1) % 2]
+                else:
+                    # Anything else (None included) is an invalid move, which loses
+                    self.winner = gp.MARKERS[(self.current_player + 1) % 2]
+                    msg = 'Invalid move!'
+                self.end_message = msg
+                return self.winner
+
+            points = self.getPoints(move)
+            if points < 0:
+                # Unknown or already marked edge
+                self.winner = gp.MARKERS[(self.current_player + 1) % 2]
+                self.end_message = 'Invalid move!'
+                return self.winner
+            self.moves += 1
+
+            if self.current_player == 0:
+                self.p1_points += points
+            else:
+                self.p2_points += points
+
+            # Completing a square means moving again
+            if points == 0:
+                self.current_player = (self.current_player + 1) % 2
+
+        if self.p1_points > self.p2_points:
+            self.winner = gp.MARKERS[0]
+        elif self.p2_points > self.p1_points:
+            self.winner = gp.MARKERS[1]
+        else:
+            self.winner = gp.DRAW
+        self.end_message = f'{self.p1_points} to {self.p2_points}'
+        return self.winner
+
     def current_player_name(self) -> str:
         return str(self.names[int(self.current_player - 1)])
 
@@ -228,5 +309,8 @@ class Game:
         # make sure inside dictionary and not marked
 
 if __name__ == "__main__":
+    # Each AI function will have its own file to allow for more modular creation
+    import human
+
     game = Game(human.human_player, human.human_player, p1_name='Player 1', p2_name='Player 2', rand_start=True)
     game.run()
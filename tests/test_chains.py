@@ -0,0 +1,54 @@
+import math
+
+import pytest
+
+from Chains import chainMove, clearAnalysisCache
+from Constants import *
+from Endgame import EndgameSolver
+from Position import *
+
+
+def borderChain(x, length, bottom=False, opened=False):
+    """
+    Get the undrawn edges of a chain of boxes along the top (or bottom) border, starting at column x. Both ends run
+    into the border; an opened chain has its first box's border side drawn, so that box can be captured.
+    """
+    y = BOARD_SIZE - 1 if bottom else 0
+    border = lambda column: horizontalEdge(column, y + 1) if bottom else horizontalEdge(column, y)
+    edges = [verticalEdge(column + 1, y) for column in range(x, x + length - 1)]
+    edges.append(border(x + length - 1))
+    if not opened:
+        edges.append(border(x))
+    return edges
+
+
+# The top right corner box as a chain of one
+CORNER_BOX = [horizontalEdge(BOARD_SIZE - 1, 0), verticalEdge(BOARD_SIZE, 0)]
+
+# Loony endgames of independent chains, as their undrawn edges
+ENDGAMES = {
+    # Opened domino with a short chain left: the player keeping control has to open the long chain, so take all
+    "opened 2, rest 1 and 3": borderChain(0, 2, bottom=True, opened=True) + CORNER_BOX + borderChain(0, 3),
+    "opened 2, rest 1 and 4": borderChain(0, 2, bottom=True, opened=True) + CORNER_BOX + borderChain(0, 4),
+    # Opened domino with one long chain left: decline the domino
+    "opened 2, rest 4": borderChain(0, 2, bottom=True, opened=True) + borderChain(0, 4),
+    "opened 2, rest 3 and 3": borderChain(0, 2, bottom=True, opened=True) + borderChain(0, 3) + borderChain(4, 3),
+    "opened 5, rest 3": borderChain(0, 5, bottom=True, opened=True) + borderChain(0, 3),
+    # Nothing opened: which chain to open
+    "rest 1, 2 and 3": CORNER_BOX + borderChain(0, 2, bottom=True) + borderChain(0, 3),
+    "rest 3 and 4": borderChain(0, 3) + borderChain(4, 4),
+}
+
+
+@pytest.mark.parametrize("name", sorted(ENDGAMES))
+def test_chain_move_is_optimal(name):
+    edges = ALL_EDGES
+    for edge in ENDGAMES[name]:
+        edges &= ~(1 << edge)
+    clearAnalysisCache()
+
+    move = chainMove(Position(edges), Player.P1)
+    assert move is not None
+
+    solver = EndgameSolver()
+    assert solver.moveValue(edges, move, -math.inf, math.inf) == solver.value(edges)
@@ -0,0 +1,93 @@
+import math
+import random
+from functools import lru_cache
+
+import pytest
+
+from Constants import *
+from Endgame import EndgameSolver
+from MoveOrdering import MOVE_CAPTURE, MOVE_SAFE, classifyMove
+from Position import *
+
+# Open edges left in the test positions
+OPEN_EDGES = (8, 12, 14)
+
+
+def scatteredEndgame(seed, openEdges):
+    """
+    Get the drawn edge mask of a board with openEdges edges left undrawn at random
+    """
+    rng = random.Random(seed)
+    edges = ALL_EDGES
+    for edge in rng.sample(range(0, EDGE_COUNT), openEdges):
+        edges &= ~(1 << edge)
+    return edges
+
+
+def playedEndgame(seed, openEdges):
+    """
+    Get the drawn edge mask after random moves from the empty board leave openEdges edges undrawn. Boxes are taken
+    when they can be and no box is handed over while there are safe moves, so the endgame is made of chains and loops.
+    """
+    rng = random.Random(seed)
+    position = Position()
+    while len(position.getOpenEdges()) > openEdges:
+        moves = position.getOpenEdges()
+        for moveClass in (MOVE_CAPTURE, MOVE_SAFE):
+            preferred = [move for move in moves if classifyMove(position, move) == moveClass]
+            if preferred:
+                moves = preferred
+                break
+        position.claimEdge(rng.choice(moves), Player.P1)
+    return position.edges
+
+
+def completedBoxes(edges, move):
+    """
+    Count the boxes a move completes
+    """
+    child = edges | (1 << move)
+    return sum(1 for box in EDGE_BOXES[move] if child & BOX_EDGE_MASKS[box] == BOX_EDGE_MASKS[box])
+
+
+def moveValue(edges, move):
+    """
+    Brute-force value of making a move, for the player making it
+    """
+    completed = completedBoxes(edges, move)
+    child = edges | (1 << move)
+    return completed + negamax(child) if completed else -negamax(child)
+
+
+@lru_cache(maxsize=None)
+def negamax(edges):
+    """
+    Brute-force value of a position for the player to move: every move is tried, and completing a box means moving
+    again
+    """
+    if edges == ALL_EDGES:
+        return 0
+    best = -math.inf
+    remaining = ALL_EDGES & ~edges
+    while remaining:
+        low = remaining & -remaining
+        remaining ^= low
+        best = max(best, moveValue(edges, low.bit_length() - 1))
+    return best
+
+
+@pytest.mark.parametrize("endgame", (scatteredEndgame, playedEndgame))
+@pytest.mark.parametrize("openEdges", OPEN_EDGES)
+@pytest.mark.parametrize("seed", range(0, 10))
+def test_solver_matches_negamax(endgame, seed, openEdges):
+    edges = endgame(seed, openEdges)
+    assert EndgameSolver().value(edges) == negamax(edges)
+
+
+@pytest.mark.parametrize("endgame", (scatteredEndgame, playedEndgame))
+@pytest.mark.parametrize("seed", range(0, 10))
+def test_best_move_reaches_value(endgame, seed):
+    edges = endgame(seed, 12)
+    value, move = EndgameSolver().bestMove(edges)
+    assert value == negamax(edges)
+    assert moveValue(edges, move) == value
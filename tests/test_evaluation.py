@@ -0,0 +1,35 @@
+import random
+
+import Minimax
+from Board import Board
+from Constants import *
+
+
+def playRandomGame(seed):
+    """
+    Play a random game with makeMove, taking back a move now and then, and yield the Board after every change
+    """
+    rng = random.Random(seed)
+    board = Board()
+    player = Player.P1
+    while True:
+        openEdges = board.getOpenEdges()
+        if not openEdges:
+            return
+        if board.undoStack and rng.random() < 0.1:
+            board.unmakeMove()
+        elif not board.makeMove(rng.choice(openEdges), player):
+            player = Player.P2 if player is Player.P1 else Player.P1
+        yield board
+
+
+def test_running_totals_match_scan():
+    for seed in range(0, 5):
+        for board in playRandomGame(seed):
+            assert Minimax.evaluateBoard(board) == Minimax.evaluateBoardByScan(board.board)
+
+
+def test_position_evaluation_matches_scan():
+    for seed in range(0, 3):
+        for board in playRandomGame(seed):
+            assert Minimax.evaluatePosition(board.toPosition()) == Minimax.evaluateBoardByScan(board.board)
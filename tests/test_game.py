@@ -0,0 +1,74 @@
+import pytest
+
+import core_gameplay as gp
+from game import Game
+
+
+def firstOpenEdge(calls, index):
+    """
+    Player that marks the first unmarked edge, noting every call in calls as (player index, edges marked so far,
+    squares completed so far)
+    """
+    def player(board, name, opponent):
+        calls.append((index, sum(1 for mark in board.values() if mark), len(player.game.completed_squares)))
+        return next(edge for edge in sorted(board) if not board[edge])
+    return player
+
+
+@pytest.mark.parametrize("reply", [None, 7, "a move", (1, 2, 3), ((0, 0),), ((0, 0), (0, "x"))])
+def test_malformed_move_loses(reply):
+    """
+    A player returning something that is neither a move nor a BAD_MOVE_* signal loses with an invalid move
+    """
+    game = Game(lambda board, name, opponent: reply, lambda board, name, opponent: reply, headless=True)
+    assert game.play() == gp.MARKERS[1]
+    assert game.end_message == 'Invalid move!'
+
+
+@pytest.mark.parametrize("signal, winner", [(gp.BAD_MOVE_I_WIN, gp.MARKERS[0]), (gp.BAD_MOVE_I_LOST, gp.MARKERS[1]),
+                                            (gp.BAD_MOVE_DRAW, gp.DRAW)])
+def test_signals_end_game(signal, winner):
+    """
+    BAD_MOVE_* signals still end the game the way the player asked
+    """
+    game = Game(lambda board, name, opponent: (signal, 'Done'), None, headless=True)
+    assert game.play() == winner
+    assert game.end_message == 'Done'
+
+
+def test_headless_game_plays_to_the_end():
+    calls = []
+    first, second = firstOpenEdge(calls, 0), firstOpenEdge(calls, 1)
+    game = Game(first, second, headless=True)
+    first.game = second.game = game
+    winner = game.play()
+
+    assert game.moves == len(game.board)
+    assert all(game.board.values())
+    assert game.p1_points + game.p2_points == len(game.completed_squares)
+
+    # Completing a square keeps the turn, and only then
+    calls.append((None, len(game.board), len(game.completed_squares)))
+    assert calls[0][0] == 0
+    assert any(after[2] > before[2] for before, after in zip(calls, calls[1:]))
+    for before, after in zip(calls, calls[1:-1]):
+        assert (after[0] == before[0]) == (after[2] > before[2])
+
+    if game.p1_points > game.p2_points:
+        assert winner == gp.MARKERS[0]
+    elif game.p2_points > game.p1_points:
+        assert winner == gp.MARKERS[1]
+    else:
+        assert winner == gp.DRAW
+
+
+def test_rand_start_picks_either_player():
+    firstMovers = set()
+    for _ in range(0, 50):
+        calls = []
+        game = Game(firstOpenEdge(calls, 0), firstOpenEdge(calls, 1), headless=True, rand_start=True)
+        game.f_p1.game = game.f_p2.game = game
+        game.moves = len(game.board) - 1
+        game.play()
+        firstMovers.add(calls[0][0])
+    assert firstMovers == {0, 1}
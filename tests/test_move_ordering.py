@@ -0,0 +1,85 @@
+import math
+import random
+
+import pytest
+
+import Minimax
+from Chains import clearAnalysisCache
+from Constants import *
+from MoveOrdering import MOVE_CAPTURE, MOVE_SAFE, MoveOrderer, classifyMove
+from Position import *
+
+# Open edges left in the test positions, and the depth they are searched to
+OPEN_EDGES = (16, 20, 24, 28)
+DEPTH = 3
+
+
+class UnorderedMoves(MoveOrderer):
+    """
+    Move ordering turned off: moves are searched in the order they are given and nothing is learned from cutoffs
+    """
+
+    def orderMoves(self, position, moves, ply, hashMove=None):
+        return list(moves)
+
+    def recordCutoff(self, move, ply, depth):
+        pass
+
+
+def randomPosition(seed, openEdges):
+    """
+    Play random moves from the empty board until openEdges edges are left, returning the Position and player to move.
+    Boxes are taken when they can be and no box is handed over while there are safe moves, as in a real game.
+    """
+    rng = random.Random(seed)
+    position = Position()
+    player = Player.P1
+    while len(position.getOpenEdges()) > openEdges:
+        moves = position.getOpenEdges()
+        for moveClass in (MOVE_CAPTURE, MOVE_SAFE):
+            preferred = [move for move in moves if classifyMove(position, move) == moveClass]
+            if preferred:
+                moves = preferred
+                break
+        if not position.claimEdge(rng.choice(moves), player):
+            player = Player.P2 if player is Player.P1 else Player.P1
+    return position, player
+
+
+def search(position, player, depth, orderer):
+    """
+    Search a copy of a position from a cold transposition table with the given move ordering
+    """
+    Minimax.move_orderer = orderer
+    Minimax.transposition_table.clear()
+    clearAnalysisCache()
+    return Minimax.minimax(position.copy(), position.getOpenEdges(), depth, player, -math.inf, math.inf)
+
+
+def bestMoves(position, player, depth):
+    """
+    Find every root move that reaches the best score, searching each one without move ordering
+    """
+    values = {}
+    for move in position.getOpenEdges():
+        child = position.copy()
+        completed = child.claimEdge(move, player)
+        nextPlayer = player if completed else (Player.P2 if player is Player.P1 else Player.P1)
+        values[move] = search(child, nextPlayer, depth - 1, UnorderedMoves())[0]
+    best = max(values.values()) if player is Player.P1 else min(values.values())
+    return best, {move for move, value in values.items() if value == best}
+
+
+@pytest.mark.parametrize("openEdges", OPEN_EDGES)
+@pytest.mark.parametrize("seed", range(0, 3))
+def test_ordering_keeps_best_move_and_score(monkeypatch, seed, openEdges):
+    monkeypatch.setattr(Minimax, "move_orderer", Minimax.move_orderer)
+    position, player = randomPosition(seed, openEdges)
+
+    orderedScore, orderedMove = search(position, player, DEPTH, MoveOrderer())
+    unorderedScore, unorderedMove = search(position, player, DEPTH, UnorderedMoves())
+    best, moves = bestMoves(position, player, DEPTH)
+
+    assert orderedScore == unorderedScore == best
+    assert orderedMove in moves
+    assert unorderedMove in moves
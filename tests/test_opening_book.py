@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from Constants import *
+from OpeningBook import BOOK_HEADER, OpeningBook
+from Position import *
+
+# Seeds of the booked positions, and random moves played from the empty board to make each
+SEEDS = range(0, 4)
+MOVES = 12
+
+
+def randomPosition(seed):
+    """
+    Play random moves from the empty board, returning the Position, player to move and a move to book for it
+    """
+    rng = random.Random(seed)
+    position = Position()
+    player = Player.P1
+    for _ in range(0, MOVES):
+        if not position.makeMove(rng.choice(position.getOpenEdges()), player):
+            player = Player.P2 if player is Player.P1 else Player.P1
+    return position, player, rng.choice(position.getOpenEdges())
+
+
+@pytest.fixture
+def book(tmp_path):
+    """
+    A book of the random positions, written with OpeningBook.write and loaded back
+    """
+    entries = {}
+    for seed in SEEDS:
+        position, player, move = randomPosition(seed)
+        key, symmetry = position.canonicalKey(player)
+        entries[key] = EDGE_SYMMETRIES[symmetry][move]
+    path = str(tmp_path / "opening.book")
+    OpeningBook.write(path, entries)
+    return OpeningBook(path)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("image", range(0, SYMMETRY_COUNT))
+def test_symmetric_image_gets_mapped_move(book, seed, image):
+    position, player, move = randomPosition(seed)
+    assert book.lookup(position.transform(image), player) == EDGE_SYMMETRIES[image][move]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_unbooked_position_is_out_of_book(book, seed):
+    position, player, move = randomPosition(seed)
+    position.makeMove(move, player)
+    assert book.lookup(position, Player.P1) is None
+    assert book.lookup(Position(), Player.P1) is None
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_drawn_book_move_is_out_of_book(tmp_path, seed):
+    position, player, move = randomPosition(seed)
+    drawn = next(edge for edge in range(0, EDGE_COUNT) if not position.isOpen(edge))
+    key, symmetry = position.canonicalKey(player)
+    path = str(tmp_path / "opening.book")
+    OpeningBook.write(path, {key: EDGE_SYMMETRIES[symmetry][drawn]})
+    assert OpeningBook(path).lookup(position, player) is None
+
+
+def test_keys_are_little_endian(tmp_path):
+    path = str(tmp_path / "opening.book")
+    OpeningBook.write(path, {0x0102030405060708: 5})
+    with open(path, 'rb') as bookFile:
+        data = bookFile.read()
+    assert data[BOOK_HEADER.size:BOOK_HEADER.size + 8] == bytes([8, 7, 6, 5, 4, 3, 2, 1])
+    assert list(OpeningBook(path).keys) == [0x0102030405060708]
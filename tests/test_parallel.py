@@ -0,0 +1,25 @@
+import Minimax
+from Bench import CORPUS, replay
+from ParallelSearch import LazySMPSearch
+from TranspositionTable import PersistentTranspositionTable, TieredTranspositionTable, TranspositionTable
+
+# Depth the Lazy SMP search goes to, deep enough to store results in the persistent table
+DEPTH = 4
+
+
+def test_lazy_smp_writes_through_to_persistent_table(tmp_path, monkeypatch):
+    """
+    Lazy SMP workers keep the persistent table behind their shared one, so their deep results reach the file
+    """
+    board, player = replay(CORPUS["middlegame"])
+    persistent = PersistentTranspositionTable(str(tmp_path / "search.tt"), 1 << 12)
+    monkeypatch.setattr(Minimax, "transposition_table", TieredTranspositionTable(TranspositionTable(), persistent))
+    try:
+        search = LazySMPSearch(2)
+        try:
+            search.search(board, board.getOpenEdges(), DEPTH, player, 3600)
+        finally:
+            search.shutdown()
+        assert len(persistent) > 0
+    finally:
+        persistent.close()
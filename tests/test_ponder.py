@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+import Minimax
+from Bench import CORPUS, replay
+from ParallelSearch import LazySMPSearch, ParallelSearch
+from Ponder import Ponderer
+
+# Depth and time limit of a search that would run far longer than the tests wait, and how long a stopped search may
+# take to return
+DEPTH = 10
+TIME_LIMIT = 3600
+STOP_SECONDS = 1.0
+
+
+@pytest.mark.parametrize("searchClass, workers", [(ParallelSearch, 1), (ParallelSearch, 2), (LazySMPSearch, 2)])
+def test_search_returns_once_stopped(searchClass, workers):
+    """
+    A search started after its stop event was set returns at once, whatever deadline it was given
+    """
+    board, player = replay(CORPUS["middlegame"])
+    stop = threading.Event()
+    stop.set()
+    search = searchClass(workers)
+    try:
+        start = time.time()
+        move = search.search(board, board.getOpenEdges(), DEPTH, player, TIME_LIMIT, stop)
+        assert time.time() - start < STOP_SECONDS
+        assert move in board.getOpenEdges()
+    finally:
+        search.shutdown()
+    assert Minimax.search_stop is None
+
+
+@pytest.mark.parametrize("searchClass, workers", [(ParallelSearch, 1), (ParallelSearch, 2)])
+def test_ponder_stop(searchClass, workers):
+    """
+    Stopping the ponderer cuts its search off, and the next search gets its whole time limit
+    """
+    board, player = replay(CORPUS["middlegame"])
+    search = searchClass(workers)
+    ponderer = Ponderer(search)
+    try:
+        ponderer.start(board, player)
+        time.sleep(0.3)
+        start = time.time()
+        ponderer.stop()
+        assert time.time() - start < STOP_SECONDS
+
+        start = time.time()
+        search.search(board, board.getOpenEdges(), DEPTH, player, 0.5)
+        assert time.time() - start < 0.5 + STOP_SECONDS
+    finally:
+        ponderer.stop()
+        search.shutdown()
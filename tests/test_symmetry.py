@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from Constants import *
+from Position import *
+
+
+def randomPosition(seed, moves):
+    """
+    Play random moves with makeMove from the empty board, returning the Position and player to move
+    """
+    rng = random.Random(seed)
+    position = Position()
+    player = Player.P1
+    for _ in range(0, moves):
+        if not position.makeMove(rng.choice(position.getOpenEdges()), player):
+            player = Player.P2 if player is Player.P1 else Player.P1
+    return position, player
+
+
+def symmetricPosition(seed, edges, group):
+    """
+    Draw random edges together with all their images under a group of symmetries, so the group leaves the Position
+    unchanged
+    """
+    rng = random.Random(seed)
+    drawn = 0
+    for edge in rng.sample(range(0, EDGE_COUNT), edges):
+        for symmetry in group:
+            drawn |= 1 << EDGE_SYMMETRIES[symmetry][edge]
+    return Position(drawn)
+
+
+# The symmetries that are their own inverse (the reflections and the half turn), each making a group with the identity
+INVOLUTIONS = [symmetry for symmetry in range(1, SYMMETRY_COUNT) if INVERSE_SYMMETRIES[symmetry] == symmetry]
+
+
+@pytest.mark.parametrize("seed", range(0, 5))
+def test_incremental_keys_match_recomputed(seed):
+    rng = random.Random(seed)
+    position, player = randomPosition(seed, 60)
+    for _ in range(0, 100):
+        if position.undoStack and rng.random() < 0.3:
+            position.unmakeMove()
+        elif position.getOpenEdges():
+            position.makeMove(rng.choice(position.getOpenEdges()), player)
+        assert position.symmetricKeys == position.computeSymmetricKeys()
+        assert position.key == position.computeKey()
+
+
+@pytest.mark.parametrize("moves", (0, 10, 60, 120, 179))
+@pytest.mark.parametrize("seed", range(0, 3))
+def test_symmetric_images_share_canonical_key(seed, moves):
+    position, player = randomPosition(seed, moves)
+    for otherPlayer in (Player.P1, Player.P2):
+        key, symmetry = position.canonicalKey(otherPlayer)
+        for image in range(0, SYMMETRY_COUNT):
+            assert position.transform(image).canonicalKey(otherPlayer)[0] == key
+
+    # The canonical form is the image the canonical key belongs to
+    canonical, symmetry = position.canonical()
+    assert canonical.key == min(position.symmetricKeys)
+    assert canonical.edges == transformEdges(position.edges, symmetry)
+
+
+@pytest.mark.parametrize("group", [tuple(range(0, SYMMETRY_COUNT))] + [(0, symmetry) for symmetry in INVOLUTIONS])
+@pytest.mark.parametrize("seed", range(0, 3))
+def test_unique_moves_keeps_one_move_per_orbit(seed, group):
+    position = symmetricPosition(seed, 10, group)
+    assert set(group) <= set(position.symmetries())
+
+    moves = position.getOpenEdges()
+    kept = position.uniqueMoves(moves)
+    orbits = {frozenset(EDGE_SYMMETRIES[symmetry][move] for symmetry in position.symmetries()) for move in moves}
+    assert len(kept) == len(orbits)
+    for orbit in orbits:
+        assert len(orbit & set(kept)) == 1
+
+
+def test_unique_moves_keeps_everything_without_symmetry():
+    position, player = randomPosition(1, 30)
+    assert position.symmetries() == [0]
+    assert position.uniqueMoves(position.getOpenEdges()) == position.getOpenEdges()
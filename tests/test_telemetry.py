@@ -0,0 +1,40 @@
+import json
+
+import Minimax
+from Bench import CORPUS, replay, resetSearch
+from Telemetry import TelemetryLog, mergeStatistics
+
+# Depth the test position is searched to
+DEPTH = 3
+
+
+def search():
+    """
+    Search the middlegame benchmark position from cold and return the statistics
+    """
+    resetSearch()
+    board, player = replay(CORPUS["middlegame"])
+    Minimax.iterative_deepening(board, board.getOpenEdges(), DEPTH, player, 3600)
+    return Minimax.search_statistics
+
+
+def test_cutoffs_by_depth_add_up_to_totals():
+    statistics = search()
+    byDepth = statistics['cutoffs_by_depth']
+    assert [counts['depth'] for counts in byDepth] == list(range(1, DEPTH + 1))
+    for counter in ('expanded_nodes', 'cutoffs', 'first_move_cutoffs'):
+        assert sum(counts[counter] for counts in byDepth) == statistics[counter]
+
+
+def test_merged_and_logged_cutoffs_by_depth(tmp_path):
+    statistics = search()
+    merged = mergeStatistics([statistics, statistics])
+    for single, double in zip(statistics['cutoffs_by_depth'], merged['cutoffs_by_depth']):
+        assert double == {key: value if key == 'depth' else 2 * value for key, value in single.items()}
+
+    path = str(tmp_path / "telemetry.jsonl")
+    TelemetryLog(path).record(0, "search", 8.0, 1.0, merged)
+    with open(path) as logFile:
+        entry = json.loads(logFile.readline())
+    for counts in entry['cutoffs_by_depth']:
+        assert counts['cutoff_rate'] == round(counts['cutoffs'] / counts['expanded_nodes'], 4)
@@ -0,0 +1,48 @@
+import pytest
+
+import TranspositionTable
+from Constants import *
+from TranspositionTable import PersistentTranspositionTable
+
+# Slots in the test tables, and the entry every test stores
+ENTRIES = 1 << 8
+KEY = 0x123456789ABCDEF
+ENTRY = (5, Bound.EXACT, 1200, 17)
+
+
+def write_table(path):
+    """
+    Make a table file holding the test entry
+    """
+    table = PersistentTranspositionTable(path, ENTRIES)
+    table.store(KEY, ENTRY[0], ENTRY[1], ENTRY[2], ENTRY[3])
+    table.close()
+
+
+def test_entries_survive_reopening(tmp_path):
+    """
+    A table file reopened by the same build keeps its entries
+    """
+    path = str(tmp_path / "search.tt")
+    write_table(path)
+    table = PersistentTranspositionTable(path, ENTRIES)
+    try:
+        assert table.probe(KEY) == ENTRY
+    finally:
+        table.close()
+
+
+@pytest.mark.parametrize("name", ["EVALUATION_VERSION", "PERSISTENT_FORMAT_VERSION", "ZOBRIST_SEED"])
+def test_mismatched_file_is_started_over(tmp_path, monkeypatch, name):
+    """
+    A table file written with another evaluation version, file format or Zobrist seed is emptied rather than trusted
+    """
+    path = str(tmp_path / "search.tt")
+    write_table(path)
+    monkeypatch.setattr(TranspositionTable, name, getattr(TranspositionTable, name) + 1)
+    table = PersistentTranspositionTable(path, ENTRIES)
+    try:
+        assert table.probe(KEY) is None
+        assert len(table) == 0
+    finally:
+        table.close()